@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Size and decoding time of complete and delta encoded extended payloads.
+
+For each number of accounts × folders, a "new" event is encoded completely
+(like the add-on does without the option "Only send the accounts and folders,
+when they have changed") and delta encoded with one changed folder. The
+decoding time includes completing the delta encoded payload with
+`nativedelta.Snapshot`.
+
+Usage:
+    python3 benchmarks/bench_delta.py [--repeat N]
+
+MIT License
+Copyright (C) 2026  The Scriptable Notifications contributors
+
+"""
+
+import argparse
+import json
+import time
+
+import payloads
+
+import nativedelta
+import nativemessaging
+
+
+SIZES = [(1, 1), (3, 2), (10, 5), (20, 10)]
+
+
+def delta_frames(payload, repeat):
+    """Return the delta encoded frames for `repeat` "new" events."""
+    frames = []
+    for i in range(repeat):
+        folder = dict(payload['folders'][0], unreadMessageCount=8 + i)
+        frames.append(payloads.frame({
+            'event': payload['event'],
+            'message': payload['message'],
+            'changedFolders': [folder],
+            'version': {
+                'accounts': 'a1', 'foldersBase': f'f{i}',
+                'folders': f'f{i + 1}'},
+            'seq': i + 2}))
+    return frames
+
+
+def decode_time(frames, snapshot=None):
+    """Return the time (µs) to decode (and complete) each frame."""
+    header = nativemessaging.HEADER.size
+    start = time.perf_counter()
+    for frame in frames:
+        payload = nativemessaging.decode(memoryview(frame)[header:])
+        if snapshot is not None:
+            snapshot.apply(payload)
+    return (time.perf_counter() - start) / len(frames) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f'{"accounts × folders":20s} {"complete":>22s} {"delta":>22s}')
+    for accounts, folders in SIZES:
+        payload = payloads.extended_payload(accounts, folders)
+        full = [payloads.frame(payload)] * args.repeat
+
+        snapshot = nativedelta.Snapshot()
+        snapshot.apply(dict(
+            json.loads(json.dumps(payload)), event='start', seq=1,
+            version={'accounts': 'a1', 'folders': 'f0'}))
+        delta = delta_frames(payload, args.repeat)
+
+        print(
+            f'{f"{accounts} × {folders}":20s} '
+            f'{len(full[0]):7d} B {decode_time(full):8.1f} µs '
+            f'{len(delta[0]):7d} B {decode_time(delta, snapshot):8.1f} µs')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the native messaging framing.
+
+Compares the `nativemessaging.Reader` with the former way of reading a frame
+(`read(4)` followed by `read(length)` on `sys.stdin.buffer`). The input is a
+stream of large "extended" payloads, which is handed out in chunks of the
+size of a pipe buffer, like Thunderbird does.
+
+Usage:
+    python3 benchmarks/bench_framing.py [--accounts N] [--folders M] [--frames K]
+
+MIT License
+Copyright (C) 2026  The Scriptable Notifications contributors
+
+"""
+
+import argparse
+import io
+import struct
+import time
+
+import payloads
+
+import nativemessaging
+
+
+# Linux pipe capacity
+PIPE_CHUNK = 64 * 1024
+
+
+class PipeStream(io.RawIOBase):
+    """A raw stream returning at most `chunk` bytes per read."""
+
+    def __init__(self, data, chunk=PIPE_CHUNK):
+        self.data = memoryview(data)
+        self.chunk = chunk
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), self.chunk, len(self.data) - self.pos)
+        b[:n] = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+
+def legacy(data):
+    """Read all frames the way the scripts used to do it."""
+    stream = io.BufferedReader(PipeStream(data))
+    frames = copied = 0
+    while True:
+        raw_length = stream.read(4)
+        if len(raw_length) == 0:
+            break
+        length = struct.unpack('@I', raw_length)[0]
+        message = stream.read(length)
+        message.decode('utf-8')
+        frames += 1
+        # Every frame is copied out of the buffer into new bytes objects
+        copied += 4 + length
+    return frames, copied
+
+
+def buffered(data):
+    """Read all frames with the `nativemessaging.Reader`."""
+    reader = nativemessaging.Reader(PipeStream(data))
+    while True:
+        frame = reader.read_frame()
+        if frame is None:
+            break
+        str(frame, 'utf-8')
+    return reader.frames, reader.bytes_copied
+
+
+def run(name, function, data, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frames, copied = function(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(
+        f'{name:10s} {frames / best:12.0f} frames/s '
+        f'{copied / frames:12.0f} bytes copied/frame')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--accounts', type=int, default=20)
+    parser.add_argument('--folders', type=int, default=10)
+    parser.add_argument('--frames', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    frame = payloads.frame(
+        payloads.extended_payload(args.accounts, args.folders))
+    data = frame * args.frames
+    print(f'{args.frames} frames of {len(frame)} bytes')
+
+    run('legacy', legacy, data, args.repeat)
+    run('buffered', buffered, data, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Load generator measuring the latency of a native script for events.
+
+The script is run like Thunderbird runs it (with the path of the manifest and
+the ID of the add-on as arguments) and fed with framed payloads at a
+controlled rate:
+    connection based
+        One process gets all events. The latency is the time from writing
+        the frame until its reply has been read.
+    connectionless
+        A process is started for every event (at most `--concurrency` at the
+        same time). The latency is the time from spawning the process until
+        its reply has been read.
+
+The payloads are either synthesized for `--accounts` × `--folders` folders
+(alternating "new" and "read" events after a "start" event) or replayed from
+the log of one of the logging scripts (`--replay`, see
+`scriptExamples/common/eventlog.py`).
+
+The 50th and 99th percentile and the maximum of the latency and the
+throughput are reported.
+
+Usage:
+    python3 benchmarks/bench_latency.py SCRIPT [--mode connectionbased]
+        [--events N] [--rate EVENTS_PER_S] [--accounts N] [--folders M]
+        [--replay LOGFILE]
+
+MIT License
+Copyright (C) 2026  The Scriptable Notifications contributors
+
+"""
+
+import argparse
+import concurrent.futures
+import math
+import os
+import pathlib
+import subprocess
+import tempfile
+import threading
+import time
+
+import hosts
+import payloads
+
+import eventlog
+
+
+def synthesize(events, accounts, folders):
+    """Return `events` payloads: "start", then "new" and "read" events."""
+    result = [payloads.extended_payload(accounts, folders, event='start')]
+    for i in range(1, events):
+        result.append(payloads.extended_payload(
+            accounts, folders, event='new' if i % 2 else 'read',
+            message_id=f'{i:08x}-0cea-c454-e6c3-86f452807092'))
+    return result
+
+
+def replay(path, events):
+    """Return up to `events` payloads recorded in the log at `path`."""
+    result = []
+    for record in eventlog.read(path):
+        if 'payload' in record:
+            result.append(record['payload'])
+            if len(result) == events:
+                break
+    if not result:
+        raise SystemExit(f'{path}: no payloads recorded')
+    return result
+
+
+def wait_until(deadline):
+    delay = deadline - time.perf_counter()
+    if delay > 0:
+        time.sleep(delay)
+
+
+def run_connection_based(path, frames, rate, env, timeout):
+    """Return the latencies (ms) of the frames sent to one process."""
+    process = subprocess.Popen(
+        hosts.command(path),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL, env=env)
+    sent = [None] * len(frames)
+    latencies = []
+
+    def read_replies():
+        for i in range(len(frames)):
+            if hosts.read_reply(process.stdout) is None:
+                break
+            latencies.append((time.perf_counter() - sent[i]) * 1000)
+
+    reader = threading.Thread(target=read_replies)
+    reader.start()
+    start = time.perf_counter()
+    try:
+        for i, frame in enumerate(frames):
+            if rate:
+                wait_until(start + i / rate)
+            sent[i] = time.perf_counter()
+            process.stdin.write(frame)
+            process.stdin.flush()
+        reader.join(timeout)
+        process.stdin.close()
+        process.wait(timeout)
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        reader.join()
+    if len(latencies) < len(frames):
+        raise RuntimeError(
+            f'{len(frames) - len(latencies)} events without reply')
+    return latencies
+
+
+def run_connectionless(path, frames, rate, env, timeout, concurrency):
+    """Return the latencies (ms) of the frames sent to one process each."""
+    start = time.perf_counter()
+
+    def send(i, frame):
+        if rate:
+            wait_until(start + i / rate)
+        return hosts.ack_time(path, frame, env, timeout)[0]
+
+    with concurrent.futures.ThreadPoolExecutor(concurrency) as executor:
+        return list(executor.map(send, range(len(frames)), frames))
+
+
+def percentile(values, p):
+    """Return the `p`th percentile (nearest rank) of `values`."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('script', type=pathlib.Path)
+    parser.add_argument(
+        '--mode', choices=('connectionbased', 'connectionless'),
+        default='connectionbased')
+    parser.add_argument('--events', type=int, default=200)
+    parser.add_argument('--rate', type=float, default=0,
+                        help='events per second, 0 for as fast as possible')
+    parser.add_argument('--accounts', type=int, default=3)
+    parser.add_argument('--folders', type=int, default=2)
+    parser.add_argument('--replay', type=pathlib.Path,
+                        help='the log of a logging script')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='processes at the same time (connectionless)')
+    parser.add_argument('--timeout', type=float, default=30)
+    args = parser.parse_args()
+
+    if args.replay:
+        events = replay(args.replay, args.events)
+    else:
+        events = synthesize(args.events, args.accounts, args.folders)
+    frames = [payloads.frame(payload) for payload in events]
+
+    with tempfile.TemporaryDirectory() as home:
+        env = dict(os.environ)
+        env.update(
+            HOME=home,
+            XDG_CACHE_HOME=os.path.join(home, '.cache'),
+            XDG_STATE_HOME=os.path.join(home, '.local', 'state'),
+            XDG_RUNTIME_DIR=home)
+        start = time.perf_counter()
+        if args.mode == 'connectionbased':
+            latencies = run_connection_based(
+                args.script, frames, args.rate, env, args.timeout)
+        else:
+            latencies = run_connectionless(
+                args.script, frames, args.rate, env, args.timeout,
+                args.concurrency)
+        elapsed = time.perf_counter() - start
+
+    print(
+        f'{args.script.name} ({args.mode}): {len(latencies)} events, '
+        f'{sum(map(len, frames)) / len(frames):.0f} bytes/event')
+    print(
+        f'latency p50 {percentile(latencies, 50):8.2f} ms  '
+        f'p99 {percentile(latencies, 99):8.2f} ms  '
+        f'max {max(latencies):8.2f} ms')
+    print(f'throughput {len(latencies) / elapsed:8.1f} events/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Memory used per new message remembered by the system tray icon.
+
+The memory allocated (measured with `tracemalloc`) for `--messages` message
+IDs is compared between a `set` of the message ID strings and the
+`MessageIds` of `script-systemtrayicon.py`. The benchmark fails (exit status
+1), if `MessageIds` needs more than `--limit` bytes per message, or if the
+count is wrong after the oldest messages have been forgotten.
+
+Usage:
+    python3 benchmarks/bench_memory.py [--messages N] [--limit BYTES]
+
+MIT License
+Copyright (C) 2026  The Scriptable Notifications contributors
+
+"""
+
+import argparse
+import sys
+import tracemalloc
+
+import hosts
+
+
+def message_ids(n):
+    return [
+        f'{i:08x}-0cea-c454-e6c3-86f452807092@nowhere.org'
+        for i in range(n)]
+
+
+def allocated(factory, ids):
+    """Return the bytes allocated for adding `ids` to `factory()`."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    container = factory()
+    for message_id in ids:
+        # A copy, like the decoded payload would be
+        container.add(''.join(message_id))
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, container
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--messages', type=int, default=10000)
+    parser.add_argument('--limit', type=float, default=32,
+                        help='bytes allowed per message')
+    args = parser.parse_args()
+
+    tray = hosts.load(hosts.TRAY)
+    ids = message_ids(args.messages)
+
+    size, _ = allocated(set, ids)
+    print(f'{"set of str":24s} {size / args.messages:8.1f} bytes/message')
+    size, compact = allocated(
+        lambda: tray.MessageIds(args.messages), ids)
+    per_message = size / args.messages
+    print(f'{"MessageIds":24s} {per_message:8.1f} bytes/message')
+
+    failed = False
+    if per_message > args.limit:
+        print(f'FAILED: more than {args.limit} bytes/message')
+        failed = True
+
+    # The count stays correct, when the oldest messages are forgotten
+    bounded = tray.MessageIds(args.messages // 10)
+    for message_id in ids + ids[-10:]:
+        bounded.add(message_id)
+    if len(bounded) != args.messages or ids[0] in bounded:
+        print(f'FAILED: {bounded!r} after {args.messages} messages')
+        failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
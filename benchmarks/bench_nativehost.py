@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Throughput of the `nativehost` runtime, when the handler does slow I/O.
+
+The frames are written into a pipe by a thread (like Thunderbird does) and
+handled by a `NativeHost`, whose handler sleeps for `--delay` seconds. This is
+compared with the synchronous `nativemessaging.Receiver`, which handles one
+event after the other.
+
+Usage:
+    python3 benchmarks/bench_nativehost.py [--frames N] [--delay S]
+
+MIT License
+Copyright (C) 2026  The Scriptable Notifications contributors
+
+"""
+
+import argparse
+import asyncio
+import os
+import threading
+import time
+
+import payloads
+
+import nativehost
+import nativemessaging
+
+
+def feed(fd, data):
+    """Write `data` into the pipe and close it."""
+    with open(fd, 'wb') as pipe:
+        pipe.write(data)
+
+
+def run_receiver(data, delay):
+    read_fd, write_fd = os.pipe()
+    feeder = threading.Thread(target=feed, args=(write_fd, data))
+    feeder.start()
+
+    def on_frame(frame):
+        nativemessaging.decode(frame)
+        time.sleep(delay)
+
+    with open(read_fd, 'rb', buffering=0) as stdin:
+        nativemessaging.Receiver(nativemessaging.Reader(stdin)).run(on_frame)
+    feeder.join()
+
+
+def run_host(data, delay, workers, queue_size):
+    read_fd, write_fd = os.pipe()
+    feeder = threading.Thread(target=feed, args=(write_fd, data))
+    feeder.start()
+
+    with open(read_fd, 'rb') as stdin, open(os.devnull, 'wb') as stdout:
+        host = nativehost.NativeHost(
+            queue_size=queue_size, workers=workers, reply=None,
+            stdin=stdin, stdout=stdout)
+
+        @host.on()
+        async def on_event(payload):
+            await asyncio.sleep(delay)
+
+        asyncio.run(host.run())
+    feeder.join()
+
+
+def measure(name, function, frames, *args):
+    start = time.perf_counter()
+    function(*args)
+    elapsed = time.perf_counter() - start
+    print(f'{name:28s} {frames / elapsed:10.1f} events/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--delay', type=float, default=0.01)
+    parser.add_argument('--queue-size', type=int, default=16)
+    args = parser.parse_args()
+
+    data = b''.join(
+        payloads.frame(payloads.extended_payload(event='new'))
+        for _ in range(args.frames))
+    print(f'{args.frames} events, handler sleeps {args.delay} s')
+
+    measure(
+        'receiver (synchronous)', run_receiver, args.frames,
+        data, args.delay)
+    for workers in (1, 4, 16):
+        measure(
+            f'nativehost ({workers} workers)', run_host, args.frames,
+            data, args.delay, workers, args.queue_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Decoding and accessing an extended payload as dictionaries or as the typed
+model of `nativepayload`.
+
+A "new" event with `--accounts` × `--folders` folders (50 by default) and
+`--batch` messages is decoded with `json` (and `orjson`, if it is installed)
+into dictionaries or into `nativepayload.Event` objects. Then the fields used
+by the system tray icon (the key and the unread count of every folder, the
+key of the folder and the ID of every message) are read `--accesses` times.
+
+Usage:
+    python3 benchmarks/bench_payload.py [--accounts N] [--folders M]
+        [--batch N] [--accesses N] [--repeat N]
+
+MIT License
+Copyright (C) 2026  The Scriptable Notifications contributors
+
+"""
+
+import argparse
+import json
+import time
+
+import payloads
+
+import nativemessaging
+import nativepayload
+
+
+def access_dict(payload):
+    """Read the fields used by the tray icon from the dictionaries."""
+    for folder in payload['folders']:
+        key = f'{folder["accountId"]}{folder["path"]}'
+        count = folder['unreadMessageCount']
+    for message in payload['messages']:
+        key = f'{message["folder"]["accountId"]}{message["folder"]["path"]}'
+        message_id = message['messageId']
+    return key, count, message_id
+
+
+def access_model(event):
+    """Read the fields used by the tray icon from the `Event`."""
+    for folder in event.folders:
+        key = folder.key
+        count = folder.unread_message_count
+    for message in event.messages:
+        key = message.folder.key
+        message_id = message.message_id
+    return key, count, message_id
+
+
+def measure(body, loads, access, accesses, repeat):
+    """Return the time (µs) to decode `body` and to access it."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        payload = loads(body)
+    decoded = time.perf_counter()
+    for _ in range(repeat):
+        for _ in range(accesses):
+            access(payload)
+    accessed = time.perf_counter()
+    return (
+        (decoded - start) / repeat * 1e6,
+        (accessed - decoded) / repeat * 1e6)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--accounts', type=int, default=5)
+    parser.add_argument('--folders', type=int, default=10)
+    parser.add_argument('--batch', type=int, default=1)
+    parser.add_argument('--accesses', type=int, default=3,
+                        help='times the fields are read per event')
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    payload = payloads.extended_payload(
+        args.accounts, args.folders, batch=args.batch)
+    body = json.dumps(payload).encode('utf-8')
+
+    def json_loads(body):
+        return json.loads(str(body, 'utf-8'))
+
+    backends = [('json', json_loads)]
+    if nativemessaging.orjson is not None:
+        backends.append(('orjson', nativemessaging.orjson.loads))
+
+    print(
+        f'{args.accounts} × {args.folders} folders, {args.batch} messages, '
+        f'{len(body)} bytes')
+    print(f'{"":24s} {"decode":>11s} {"access":>11s} {"total":>11s}')
+    for name, loads in backends:
+        rows = [
+            (f'dict ({name})', loads, access_dict),
+            (f'Event ({name})',
+             lambda body, loads=loads: nativepayload.Event.from_dict(
+                 loads(body)),
+             access_model),
+        ]
+        for label, decode, access in rows:
+            decoding, accessing = measure(
+                body, decode, access, args.accesses, args.repeat)
+            print(
+                f'{label:24s} {decoding:8.1f} µs {accessing:8.1f} µs '
+                f'{decoding + accessing:8.1f} µs')
+
+
+if __name__ == '__main__':
+    main()
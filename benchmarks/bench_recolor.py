@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Recoloring of the tray icon: the former pixel by pixel loop compared with the
+bulk operations of Pillow used by `PostHorn.__call__`.
+
+Both are run for the four colors of `CONFIG['color']` of the system tray
+script, and the results are checked to be the same pixel for pixel.
+
+Requires Pillow and pystray (like the system tray script).
+
+Usage:
+    python3 benchmarks/bench_recolor.py [--repeat N]
+
+MIT License
+Copyright (C) 2026  The Scriptable Notifications contributors
+
+"""
+
+import argparse
+import time
+
+import hosts
+
+
+def legacy(posthorn, fill=None, outline=None, background=None):
+    """The former implementation of `PostHorn.__call__`."""
+    img = posthorn.image.copy()
+    color_pairs = []
+    if fill is not None:
+        color_pairs.append((posthorn._fill, fill))
+    if outline is not None:
+        color_pairs.append((posthorn._outline, outline))
+    if background is not None:
+        color_pairs.append((posthorn._background, background))
+    for x in range(img.width):
+        for y in range(img.height):
+            for from_color, to_color in color_pairs:
+                if img.getpixel((x, y)) == from_color:
+                    img.putpixel((x, y), to_color)
+    return img
+
+
+def measure(name, function, colors, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        images = [function(**color) for color in colors]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f'{name:8s} {best * 1000:10.2f} ms for {len(colors)} icons')
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    tray = hosts.load(hosts.TRAY)
+    posthorn = tray.PostHorn()
+    colors = list(tray.CONFIG['color'].values()) + [
+        # Chained replacements: the new fill is the old outline color
+        {'fill': posthorn._outline, 'outline': (1, 2, 3, 4),
+         'background': (9, 9, 9, 9)}]
+
+    old = measure(
+        'legacy', lambda **color: legacy(posthorn, **color),
+        colors, args.repeat)
+    new = measure('bulk', posthorn, colors, args.repeat)
+
+    for old_image, new_image in zip(old, new):
+        assert old_image.tobytes() == new_image.tobytes(), 'Images differ'
+    print('Images are identical')
+
+
+if __name__ == '__main__':
+    main()
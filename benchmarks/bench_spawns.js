@@ -0,0 +1,127 @@
+#!/usr/bin/env node
+// Number of native script calls (spawns in the connectionless mode) in the
+// "simple" mode during a simulated mail burst.
+//
+// `src/background.js` is loaded with stubs for the `messenger`/`browser`
+// APIs of Thunderbird. Then `--events` new messages arrive one by one in a
+// checked folder and are read again. The calls of `sendNativeMessage` are
+// counted with and without the option "Only call the script, when the state
+// changes" (`onlyStateChanges`). The check fails (exit status 1), if the
+// script is called more often than the state changes: once for the first new
+// message ("true") and once for the last read message ("false").
+//
+// Usage:
+//     node benchmarks/bench_spawns.js [--events N]
+//
+// MIT License
+// Copyright (C) 2026  The Scriptable Notifications contributors
+
+"use strict";
+
+const fs = require("fs");
+const path = require("path");
+const vm = require("vm");
+
+const BACKGROUND = path.join(__dirname, "..", "src", "background.js");
+
+// An event of the WebExtension APIs, whose listeners can be fired
+function makeEvent() {
+  const listeners = new Set();
+  return {
+    addListener: (listener) => listeners.add(listener),
+    removeListener: (listener) => listeners.delete(listener),
+    fire: async (...args) => {
+      for (const listener of listeners) {
+        await listener(...args);
+      }
+    },
+  };
+}
+
+// Load 'background.js' with the options and return the stubbed APIs
+function load(options) {
+  const folder = { id: "folder1", accountId: "account1", path: "/INBOX" };
+  const state = { unread: 0, sent: [] };
+  const storage = Object.assign(
+    { scriptType: "simple", foldersToCheck: [folder] }, options);
+  const api = {
+    storage: {
+      local: {
+        get: async (defaults) => Object.assign({}, defaults, storage),
+      },
+      onChanged: makeEvent(),
+    },
+    messages: {
+      onNewMailReceived: makeEvent(),
+      onUpdated: makeEvent(),
+    },
+    folders: {
+      getFolderInfo: async () => ({ unreadMessageCount: state.unread }),
+    },
+    accounts: { list: async () => [] },
+    runtime: {
+      onMessage: makeEvent(),
+      sendNativeMessage: async (name, payload) => {
+        state.sent.push(payload);
+        return {};
+      },
+    },
+  };
+  const context = vm.createContext({
+    window: {},
+    document: { addEventListener: () => {} },
+    messenger: api,
+    browser: api,
+    console: { debug: () => {}, log: console.log, error: console.error },
+    performance: { now: () => 0, timeOrigin: 0 },
+    setInterval: () => 0,
+    setTimeout: setTimeout,
+  });
+  vm.runInContext(fs.readFileSync(BACKGROUND, "utf8"), context,
+                  { filename: BACKGROUND });
+  return { api, folder, state };
+}
+
+// Let the new messages arrive and read them again
+async function burst(options, events) {
+  const { api, folder, state } = load(options);
+  const messages = [];
+  for (let i = 0; i < events; i++) {
+    const message = { id: i, junk: false, read: false, folder: folder };
+    messages.push(message);
+    state.unread += 1;
+    await api.messages.onNewMailReceived.fire(
+      folder, { messages: [message] });
+  }
+  for (const message of messages) {
+    message.read = true;
+    state.unread -= 1;
+    await api.messages.onUpdated.fire(message, { read: true });
+  }
+  return state.sent;
+}
+
+async function main() {
+  const index = process.argv.indexOf("--events");
+  const events = index > 0 ? parseInt(process.argv[index + 1], 10) : 100;
+
+  const always = await burst({ onlyStateChanges: false }, events);
+  const changes = await burst({ onlyStateChanges: true }, events);
+  console.log(
+    `${events} new and ${events} read messages: `
+    + `${always.length} calls, ${changes.length} with onlyStateChanges`);
+
+  let failed = false;
+  if (always.length != 2 * events) {
+    console.log(`FAILED: ${always.length} calls instead of ${2 * events}`);
+    failed = true;
+  }
+  if (JSON.stringify(changes) != JSON.stringify([true, false])) {
+    console.log(
+      `FAILED: ${JSON.stringify(changes)} sent with onlyStateChanges`);
+    failed = true;
+  }
+  process.exit(failed ? 1 : 0);
+}
+
+main();
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Startup time of the sample scripts in `scriptExamples`.
+
+In the connectionless mode, Thunderbird starts the native script for every
+event, so the time to start is the time until the notification is shown. For
+every script (which runs on this platform), this measures:
+    import
+        The time spent importing modules (`python -X importtime`), beyond
+        the modules imported by the interpreter itself, as median of all
+        runs. Python scripts only.
+    cold
+        The time from spawning the script (like Thunderbird does, with the
+        path of the manifest and the ID of the add-on as arguments) until its
+        reply has been received, for the first run.
+    ack
+        The same, as median of all runs.
+
+The results can be saved and used as baseline for a later run. The benchmark
+fails (exit status 1), if any time is more than `--threshold` times (plus
+`--slack` milliseconds) the baseline.
+
+Usage:
+    python3 benchmarks/bench_startup.py [--repeat N] [--save FILE]
+    python3 benchmarks/bench_startup.py --baseline FILE [--threshold 1.5]
+
+The scripts are run with a temporary home directory. Scripts, which need
+packages or commands, which are not available, are reported as failed.
+
+MIT License
+Copyright (C) 2026  The Scriptable Notifications contributors
+
+"""
+
+import argparse
+import collections
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import hosts
+import payloads
+
+import nativedaemon
+
+
+Script = collections.namedtuple(
+    'Script', 'path mode platforms interactive',
+    defaults=(None, False))
+
+SCRIPTS = [
+    Script('extendedMode/logging/script-connectionless.py', 'extended'),
+    Script('extendedMode/logging/script-connection-based.py', 'extended'),
+    Script('extendedMode/system-tray/script-systemtrayicon.py', 'extended'),
+    Script(
+        'extendedMode/system-tray/script-systemtrayicon-shim.py', 'extended',
+        ('linux', 'darwin')),
+    Script('simpleMode/linux-simple/script.sh', 'simple', ('linux',)),
+    Script('simpleMode/linux-kde-sound-tray/script.sh', 'simple', ('linux',)),
+    Script(
+        'simpleMode/mac-simple/simpleNotification.py', 'simple',
+        ('darwin',)),
+    # Shows a dialog, which must be closed
+    Script(
+        'simpleMode/windows-simple/script.bat', 'simple', ('win32',), True),
+]
+
+
+def import_time(path, env):
+    """Return the time (ms) spent importing modules for the script."""
+    def modules(code):
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE, env=env, text=True)
+        times = {}
+        for line in process.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if not name.startswith('  '):
+                # Imported by the script itself (not by another module)
+                times[name.strip()] = int(cumulative)
+        return times
+
+    interpreter = modules('import runpy')
+    script = modules(
+        f'import runpy, sys; sys.argv = [{str(path)!r}]; '
+        f'runpy.run_path({str(path)!r}, run_name="importtime")')
+    return sum(
+        t for name, t in script.items() if name not in interpreter) / 1000
+
+
+def measure(script, repeat, env, timeout):
+    path = hosts.SCRIPTS / script.path
+    if script.mode == 'simple':
+        # `false` does not start any tray icon or sound
+        frame = payloads.frame(False)
+    else:
+        frame = payloads.frame(payloads.extended_payload(event='start'))
+
+    result = {}
+    if path.suffix == '.py':
+        result['import'] = statistics.median(
+            import_time(path, env) for _ in range(repeat))
+    acks = [
+        hosts.ack_time(path, frame, env, timeout)[0] for _ in range(repeat)]
+    result['cold'] = acks[0]
+    result['ack'] = statistics.median(acks)
+    return result
+
+
+def stop_daemons(env):
+    """Stop the daemons started by the shims."""
+    os.environ['XDG_RUNTIME_DIR'] = env['XDG_RUNTIME_DIR']
+    for script in SCRIPTS:
+        if script.path.endswith('-shim.py'):
+            name = script.path.rsplit('/', 1)[1][:-len('-shim.py')]
+            pid = nativedaemon.pid(name)
+            if pid is not None:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except OSError:
+                    pass
+
+
+def compare(results, baseline, threshold, slack):
+    """Return the list of regressions compared to the baseline."""
+    regressions = []
+    for name, before in baseline.items():
+        after = results.get(name)
+        if after is None:
+            continue
+        if 'error' in after and 'error' not in before:
+            regressions.append(f'{name}: fails ({after["error"]})')
+            continue
+        for key, value in before.items():
+            if key in after and key != 'error':
+                if after[key] > value * threshold + slack:
+                    regressions.append(
+                        f'{name}: {key} {after[key]:.1f} ms '
+                        f'(baseline {value:.1f} ms)')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=10)
+    parser.add_argument('--interactive', action='store_true',
+                        help='include scripts, which show a dialog')
+    parser.add_argument('--save', help='save the results as JSON')
+    parser.add_argument('--baseline', help='compare with saved results')
+    parser.add_argument('--threshold', type=float, default=1.5)
+    parser.add_argument('--slack', type=float, default=10,
+                        help='allowed absolute difference in ms')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as home:
+        env = dict(os.environ)
+        env.update(
+            HOME=home,
+            XDG_CACHE_HOME=os.path.join(home, '.cache'),
+            XDG_STATE_HOME=os.path.join(home, '.local', 'state'),
+            XDG_RUNTIME_DIR=home)
+        try:
+            for script in SCRIPTS:
+                if script.platforms and sys.platform not in script.platforms:
+                    continue
+                if script.interactive and not args.interactive:
+                    continue
+                try:
+                    result = measure(script, args.repeat, env, args.timeout)
+                except Exception as e:
+                    result = {'error': str(e)}
+                results[script.path] = result
+                print(f'{script.path:58s}', ' '.join(
+                    f'{key} {value:8.1f} ms' if key != 'error'
+                    else f'failed: {value}'
+                    for key, value in result.items()))
+        finally:
+            stop_daemons(env)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.slack)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
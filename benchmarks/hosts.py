@@ -0,0 +1,81 @@
+"""
+The sample scripts, which are measured by the benchmarks.
+
+MIT License
+Copyright (C) 2026  The Scriptable Notifications contributors
+
+"""
+
+import importlib.util
+import pathlib
+import subprocess
+import sys
+import time
+
+
+SCRIPTS = pathlib.Path(__file__).resolve().parents[1] / 'scriptExamples'
+
+TRAY = SCRIPTS / 'extendedMode' / 'system-tray' / 'script-systemtrayicon.py'
+LOGGING_CONNECTIONLESS = (
+    SCRIPTS / 'extendedMode' / 'logging' / 'script-connectionless.py')
+LOGGING_CONNECTION_BASED = (
+    SCRIPTS / 'extendedMode' / 'logging' / 'script-connection-based.py')
+
+# The arguments Thunderbird passes to the script
+ARGV = [
+    '/home/user/.mozilla/native-messaging-hosts/scriptableNotifications.json',
+    '{271e72b1-166c-471b-bc06-41e03f176b15}']
+
+
+def load(path):
+    """Import the script at `path` as a module (without running `main()`)."""
+    spec = importlib.util.spec_from_file_location(
+        path.stem.replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def command(path):
+    """Return the command to run the script at `path` like Thunderbird."""
+    path = pathlib.Path(path)
+    if path.suffix == '.py':
+        return [sys.executable, str(path)] + ARGV
+    return [str(path)] + ARGV
+
+
+def read_reply(stream):
+    """Read a reply frame from `stream`, `None` at the end of the stream."""
+    header = stream.read(4)
+    if len(header) < 4:
+        return None
+    return stream.read(int.from_bytes(header, sys.byteorder))
+
+
+def ack_time(path, frame, env, timeout):
+    """Return the time (ms) from spawning the script to its reply.
+
+    Returns
+    -------
+    tuple
+        The time and the reply.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        command(path),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL, env=env)
+    try:
+        process.stdin.write(frame)
+        process.stdin.flush()
+        reply = read_reply(process.stdout)
+        if reply is None:
+            raise RuntimeError('no reply')
+        elapsed = (time.perf_counter() - start) * 1000
+        process.stdin.close()
+        process.wait(timeout)
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+    return elapsed, reply
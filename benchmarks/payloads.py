@@ -0,0 +1,92 @@
+"""
+Synthetic payloads for the benchmarks.
+
+The payloads mirror what `notifyNativeScript` in `src/background.js` sends to
+the native script in the "extended" mode.
+
+MIT License
+Copyright (C) 2026  The Scriptable Notifications contributors
+
+"""
+
+import json
+import pathlib
+import struct
+import sys
+
+
+# The shared helper modules are in the folder `scriptExamples/common`
+COMMON = pathlib.Path(__file__).resolve().parents[1] / 'scriptExamples' / 'common'
+sys.path.insert(0, str(COMMON))
+
+
+def extended_payload(accounts=3, folders=2, event='new', identities=2,
+                     message_id='9477b273-0cea-c454-e6c3-86f452807092',
+                     batch=1):
+    """Build an extended payload with `accounts` × `folders` folders.
+
+    A "new" event carries `batch` messages.
+    """
+    accounts_list = {}
+    folders_list = []
+    for a in range(accounts):
+        account_id = f'account{a + 1}'
+        accounts_list[account_id] = {
+            'identities': [
+                {'email': f'name{i}.surname@account{a + 1}.example.org',
+                 'label': '',
+                 'name': 'Name Surname',
+                 'organization': 'Company'}
+                for i in range(identities)],
+            'name': f'Account {a + 1}',
+            'type': 'imap'}
+        for f in range(folders):
+            folders_list.append({
+                'accountId': account_id,
+                'favorite': f > 0,
+                'name': 'Inbox' if f == 0 else f'Folder {f}',
+                'path': '/INBOX' if f == 0 else f'/Folder{f}',
+                'totalMessageCount': 1000 + f,
+                'type': 'inbox' if f == 0 else None,
+                'unreadMessageCount': 7,
+                'seenMessageCount': 3})
+
+    if event == 'start':
+        messages = []
+    else:
+        message = {
+            'author': 'Someone Else <some.one.else@nowhere.org>',
+            'bccList': [],
+            'ccList': [],
+            'date': '2022-10-12T16:05:00.000Z',
+            'flagged': False,
+            'messageId': f'{message_id}@nowhere.org',
+            'headersOnly': False,
+            'junk': False,
+            'junkScore': 0,
+            'read': event == 'read',
+            'size': 4014,
+            'subject': 'Scriptable Notifications',
+            'tags': [],
+            'folder': {
+                'accountId': 'account1',
+                'name': 'Inbox',
+                'path': '/INBOX',
+                'type': 'inbox'}}
+        messages = [
+            dict(message, messageId=f'{i}.{message_id}@nowhere.org')
+            for i in range(1, batch if event == 'new' else 1)]
+        messages.append(message)
+
+    return {
+        'accounts': accounts_list,
+        'folders': folders_list,
+        'event': event,
+        'message': messages[-1] if messages else None,
+        'messages': messages}
+
+
+def frame(payload):
+    """Encode `payload` as a native messaging frame."""
+    body = json.dumps(payload).encode('utf-8')
+    return struct.pack('@I', len(body)) + body
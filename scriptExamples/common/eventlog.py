@@ -0,0 +1,235 @@
+"""
+A log of the events received from the "Scriptable Notifications" add-on for
+Thunderbird, with one JSON object per line (JSON Lines).
+
+The records are buffered and written, when the buffer is larger than
+`flush_bytes`, when the last write is older than `flush_interval` seconds or
+when the log is closed. If the records are written from a running asyncio
+event loop, a timer writes them `flush_interval` seconds after they have been
+buffered (the timer is only armed, while there are buffered records, so an
+idle script is not woken up). When the file would grow beyond `max_bytes`, it is
+rotated: "name.log" becomes "name.log.1" (or "name.log.1.gz", if `compress`
+is true), "name.log.1" becomes "name.log.2" and so on. Only `backups` old
+files are kept.
+
+Several processes (e.g. connectionless scripts started for events arriving
+at the same time) can write into the same log: each flush appends complete
+lines with a single write and the rotation is done under a lock (not on
+Windows).
+
+Usage
+=====
+
+    >>> with eventlog.EventLog('~/script.log') as log:
+    ...     log.write({'event': 'new'})
+
+To read the log:
+
+    >>> for record in eventlog.read('~/script.log'):
+    ...     print(record['time'], record.get('payload'))
+
+or pretty print it with `python3 -m json.tool --json-lines ~/script.log`.
+
+MIT License
+Copyright (C) 2026  The Scriptable Notifications contributors
+
+"""
+
+import json
+import os
+import pathlib
+import sys
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+
+
+# The defaults
+MAX_BYTES = 4 * 1024 * 1024
+BACKUPS = 3
+FLUSH_BYTES = 64 * 1024
+FLUSH_INTERVAL = 1.0
+
+
+def record(**fields):
+    """Return a record with the current time and the process ID."""
+    return {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'pid': os.getpid(),
+        **fields}
+
+
+def read(path):
+    """Yield the records of the log (not of the rotated files)."""
+    with open(pathlib.Path(path).expanduser(), encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class EventLog:
+    """Write records as JSON lines into a rotating log file.
+
+    Parameters
+    ----------
+    path : path
+        The log file.
+    max_bytes : int
+        Rotate the file, before it grows beyond this size. Set it to `0` to
+        never rotate. The default is `MAX_BYTES`.
+    backups : int
+        The number of rotated files kept. The default is `BACKUPS`.
+    compress : bool
+        If `True`, the rotated files are compressed with gzip.
+    flush_bytes : int
+        Write the buffered records, when they are larger. The default is
+        `FLUSH_BYTES`.
+    flush_interval : float
+        Write the buffered records, when the last write is older. The default
+        is `FLUSH_INTERVAL`.
+    """
+
+    def __init__(self, path, max_bytes=MAX_BYTES, backups=BACKUPS,
+                 compress=False, flush_bytes=FLUSH_BYTES,
+                 flush_interval=FLUSH_INTERVAL):
+        self.path = pathlib.Path(path).expanduser()
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.compress = compress
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+
+        self._buffer = []
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        self._timer = None
+        self._fd = None
+        self._encoder = json.JSONEncoder(
+            ensure_ascii=False, separators=(',', ':'), default=repr)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, record):
+        """Buffer `record` (anything JSON serialisable) as one line."""
+        line = (self._encoder.encode(record) + '\n').encode('utf-8')
+        self._buffer.append(line)
+        self._buffered += len(line)
+        if (self._buffered >= self.flush_bytes
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+        elif self._timer is None:
+            self._arm_timer()
+
+    def flush(self):
+        """Write the buffered records to the file."""
+        self._last_flush = time.monotonic()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buffer:
+            return
+        data = b''.join(self._buffer)
+        self._buffer.clear()
+        self._buffered = 0
+
+        with self._locked():
+            self._open()
+            if self.max_bytes and os.fstat(self._fd).st_size > 0:
+                if os.fstat(self._fd).st_size + len(data) > self.max_bytes:
+                    self._rotate()
+                    self._open()
+            # One write of complete lines, appended by the OS (O_APPEND)
+            os.write(self._fd, data)
+
+    def _arm_timer(self):
+        """Flush in `flush_interval` seconds, if an event loop is running."""
+        # Without asyncio imported, no event loop can be running
+        asyncio = sys.modules.get('asyncio')
+        if asyncio is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._timer = loop.call_later(self.flush_interval, self.flush)
+
+    def close(self):
+        """Flush the buffer and close the file."""
+        self.flush()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _open(self):
+        """(Re)open the file, if it has been rotated by another process."""
+        if self._fd is not None:
+            try:
+                current = os.stat(self.path)
+            except FileNotFoundError:
+                current = None
+            opened = os.fstat(self._fd)
+            if (current is not None
+                    and (current.st_dev, current.st_ino)
+                    == (opened.st_dev, opened.st_ino)):
+                return
+            os.close(self._fd)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(
+            self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+
+    def _locked(self):
+        """Return a context manager holding the lock of the log."""
+        return _Lock(self.path.with_name(f'{self.path.name}.lock'))
+
+    def _backup(self, n):
+        suffix = '.gz' if self.compress else ''
+        return self.path.with_name(f'{self.path.name}.{n}{suffix}')
+
+    def _rotate(self):
+        """Rotate the file (the lock must be held)."""
+        os.close(self._fd)
+        self._fd = None
+        if self.backups < 1:
+            os.unlink(self.path)
+            return
+        for n in range(self.backups - 1, 0, -1):
+            if self._backup(n).exists():
+                os.replace(self._backup(n), self._backup(n + 1))
+        if self.compress:
+            import gzip
+            import shutil
+            temp = self._backup(1).with_name(f'{self._backup(1).name}.tmp')
+            with open(self.path, 'rb') as src, gzip.open(temp, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(temp, self._backup(1))
+            os.unlink(self.path)
+        else:
+            os.replace(self.path, self._backup(1))
+
+
+class _Lock:
+    """An exclusive lock on a lock file (a no-op without `fcntl`)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
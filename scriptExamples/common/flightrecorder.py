@@ -0,0 +1,178 @@
+"""
+A flight recorder for native scripts working with the "Scriptable
+Notifications" add-on for Thunderbird.
+
+The recorder keeps the last `size` trace points in a preallocated ring
+buffer in memory. A trace point only stores the time, its name and its
+arguments, nothing is formatted or written. The trace points are written to
+a file next to the log file ("NAME-YYYYmmdd-HHMMSS.trace.txt", a number is
+added for more dumps within the same second), when something went wrong:
+when `dump()` is called (e.g. by the error handler of the script) or when an
+exception is not caught (after `install()`).
+
+A disabled recorder (`size=0`) replaces `trace()` by a function doing
+nothing, so the trace points cost a function call only.
+
+Usage
+=====
+
+    >>> recorder = flightrecorder.FlightRecorder('~/script.log', 1000)
+    >>> recorder.install()
+    >>> trace = recorder.trace
+
+    >>> trace('new', folder_id, unseen)
+
+Only pass small values, which do not change later (strings, numbers, ...),
+to the trace points: the buffer keeps references to them.
+
+MIT License
+Copyright (C) 2026  The Scriptable Notifications contributors
+
+"""
+
+import pathlib
+import time
+
+
+# The default number of trace points kept
+SIZE = 1000
+
+
+def _disabled(name, *args):
+    """The trace point of a disabled recorder."""
+
+
+class FlightRecorder:
+    """Keep the last trace points and write them, when something went wrong.
+
+    Parameters
+    ----------
+    path : path
+        The log file of the script. The trace points are written next to it.
+    size : int
+        The number of trace points kept. Set it to `0` to disable the
+        recorder. The default is `SIZE`.
+
+    Attributes
+    ----------
+    count : int
+        The number of trace points recorded (including those overwritten).
+    """
+
+    def __init__(self, path, size=SIZE):
+        self.path = pathlib.Path(path).expanduser()
+        self.size = size
+        self.count = 0
+        self._times = [0.0] * size
+        self._names = [None] * size
+        self._args = [None] * size
+        self._next = 0
+        if not size:
+            self.trace = _disabled
+
+    def __bool__(self):
+        return self.size > 0
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def trace(self, name, *args):
+        """Record the trace point `name` with `args`."""
+        i = self._next
+        self._times[i] = time.time()
+        self._names[i] = name
+        self._args[i] = args
+        self._next = i + 1 if i + 1 < self.size else 0
+        self.count += 1
+
+    def events(self):
+        """Return the trace points `(time, name, args)`, the oldest first."""
+        start = self._next if self.count >= self.size else 0
+        order = list(range(start, self.size)) + list(range(0, start))
+        return [
+            (self._times[i], self._names[i], self._args[i])
+            for i in order[:len(self)]]
+
+    def format(self):
+        """Return the trace points as lines of text, the oldest first."""
+        lines = []
+        for t, name, args in self.events():
+            stamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(t))
+            lines.append(' '.join(
+                [f'{stamp}.{int(t % 1 * 1e6):06d}', str(name)]
+                + [repr(arg) for arg in args]))
+        return lines
+
+    def dump(self, exc=None):
+        """Write the trace points (and the traceback of `exc`) to a file.
+
+        Returns
+        -------
+        pathlib.Path|None
+            The file written, `None` if the recorder is disabled.
+        """
+        if not self.size:
+            return None
+        lines = [
+            f'# The last {len(self)} of {self.count} trace points',
+            *self.format()]
+        if exc is not None:
+            import traceback
+            lines.extend(['', '# Exception', *traceback.format_exception(
+                type(exc), exc, exc.__traceback__)])
+        text = '\n'.join(line.rstrip('\n') for line in lines) + '\n'
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Never overwrite an earlier dump of the same second (e.g. of the
+        # error handler and of the exception hook for the same exception)
+        n = 0
+        while True:
+            suffix = f'-{n}' if n else ''
+            path = self.path.with_name(
+                f'{self.path.stem}-{stamp}{suffix}.trace.txt')
+            try:
+                with open(path, 'x', encoding='utf-8') as f:
+                    f.write(text)
+            except FileExistsError:
+                n += 1
+                continue
+            return path
+
+    def install(self):
+        """Dump the trace points, when an exception is not caught.
+
+        This works for the main thread (`sys.excepthook`) and, with Python
+        3.8+, for other threads (`threading.excepthook`). The previous hooks
+        are still called.
+        """
+        if not self.size:
+            return
+        import sys
+        import threading
+
+        sys_hook = sys.excepthook
+
+        def excepthook(exc_type, exc, tb):
+            self._dump_quietly(exc)
+            sys_hook(exc_type, exc, tb)
+
+        sys.excepthook = excepthook
+
+        # `threading.excepthook` is new in Python 3.8
+        threading_hook = getattr(threading, 'excepthook', None)
+        if threading_hook is None:
+            return
+
+        def thread_excepthook(args):
+            if args.exc_type is not SystemExit:
+                self._dump_quietly(args.exc_value)
+            threading_hook(args)
+
+        threading.excepthook = thread_excepthook
+
+    def _dump_quietly(self, exc):
+        """Dump, but do not raise another exception while crashing."""
+        try:
+            self.dump(exc)
+        except Exception:
+            pass
@@ -0,0 +1,180 @@
+"""
+A long-lived daemon fed by a thin shim script for the connectionless mode of
+the "Scriptable Notifications" add-on for Thunderbird.
+
+In the connectionless mode, Thunderbird starts the native script for every
+event. For a script, which has to import large packages or to set up a lot of
+state, this is slow - and a system tray icon would not even survive the
+event. With a daemon, the script registered in Thunderbird is only a shim,
+which starts quickly, forwards the frame over a UNIX socket to the daemon and
+passes the reply back to Thunderbird. If the daemon is not running, the shim
+starts it. The daemon exits after a configurable idle period.
+
+Usage
+=====
+
+The shim script (registered in Thunderbird):
+
+    >>> nativedaemon.shim(
+    ...     'myscript', [sys.executable, '/path/to/myscript.py', '--daemon'])
+
+The daemon (`myscript.py --daemon`) serves the socket with a
+`nativehost.NativeHost`:
+
+    >>> lock = nativedaemon.lock('myscript')
+    >>> if lock is None:
+    ...     sys.exit(0)     # Already running
+    >>> asyncio.run(host.serve(nativedaemon.socket_path('myscript'), 300))
+
+This only works with UNIX domain sockets, that is not on Windows.
+
+MIT License
+Copyright (C) 2026  The Scriptable Notifications contributors
+
+"""
+
+import os
+import pathlib
+import socket
+import sys
+import time
+
+import nativemessaging
+
+
+# Time to wait for a starting daemon
+START_TIMEOUT = 10
+
+
+def runtime_directory():
+    """Return the (private) directory for the sockets and lock files."""
+    base = os.environ.get('XDG_RUNTIME_DIR')
+    if base:
+        directory = pathlib.Path(base) / 'scriptable-notifications'
+    else:
+        import tempfile
+        directory = pathlib.Path(
+            tempfile.gettempdir(), f'scriptable-notifications-{os.getuid()}')
+    directory.mkdir(mode=0o700, exist_ok=True)
+    return directory
+
+
+def socket_path(name):
+    """Return the path of the UNIX socket of the daemon `name`."""
+    return runtime_directory() / f'{name}.sock'
+
+
+def metrics_path(name):
+    """Return the path of the UNIX socket serving the metrics of `name`."""
+    return runtime_directory() / f'{name}.metrics'
+
+
+def lock(name):
+    """Make sure, that only one daemon `name` is running.
+
+    Returns
+    -------
+    int|None
+        The file descriptor of the lock file, which must be kept open while
+        the daemon is running. `None`, if another daemon holds the lock.
+    """
+    import fcntl
+    fd = os.open(
+        runtime_directory() / f'{name}.lock', os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    # Write the process ID into the lock file (for diagnostics)
+    os.ftruncate(fd, 0)
+    os.write(fd, f'{os.getpid()}\n'.encode())
+    return fd
+
+
+def pid(name):
+    """Return the process ID of the (last) daemon `name` (or `None`)."""
+    try:
+        return int((runtime_directory() / f'{name}.lock').read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def connect(path):
+    """Connect to the daemon listening at `path`, `None` if it is not."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+    return sock
+
+
+def start(command):
+    """Start the daemon with `command` in its own session."""
+    import subprocess
+    subprocess.Popen(
+        command,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True)
+
+
+def connect_or_start(name, command, timeout=START_TIMEOUT):
+    """Connect to the daemon `name`, start it with `command` if needed."""
+    path = socket_path(name)
+    sock = connect(path)
+    if sock is not None:
+        return sock
+
+    start(command)
+    deadline = time.monotonic() + timeout
+    delay = 0.005
+    while sock is None:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f'Daemon {name!r} did not start')
+        time.sleep(delay)
+        delay = min(2 * delay, 0.1)
+        sock = connect(path)
+    return sock
+
+
+def shim(name, command, timeout=START_TIMEOUT):
+    """Forward all frames from the standard input to the daemon `name`.
+
+    The replies of the daemon are written to the standard output.
+
+    Parameters
+    ----------
+    name : str
+        The name of the daemon.
+    command : list
+        The command to start the daemon, if it is not running.
+    timeout : float
+        The time to wait for the daemon to start.
+    """
+    stdin = nativemessaging.Reader()
+    stdout = nativemessaging.Writer()
+    sock = None
+    try:
+        while True:
+            frame = stdin.read_frame()
+            if frame is None:
+                return
+            if sock is None:
+                sock = connect_or_start(name, command, timeout)
+                replies = nativemessaging.Reader(
+                    sock.makefile('rb', buffering=0))
+            sock.sendall(nativemessaging.pack(frame))
+            reply = replies.read_frame()
+            if reply is None:
+                raise EOFError(f'Daemon {name!r} closed the connection')
+            stdout.write_frame(reply)
+    except Exception as e:
+        print(f"'{sys.argv[0]}': {e}", file=sys.stderr, flush=True)
+        sys.exit(1)
+    finally:
+        if sock is not None:
+            sock.close()
@@ -0,0 +1,126 @@
+"""
+Delta encoded payloads of the "Scriptable Notifications" add-on for
+Thunderbird.
+
+With the option "Only send changes of accounts and folders", the add-on does
+not send the `accounts` and `folders` of the extended payload with every
+event, but only when they change:
+    version : dict
+        The versions of the data the payload refers to:
+            'accounts' : the version of the accounts,
+            'folders' : the version of the folders after this payload,
+            'foldersBase' : the version of the folders `changedFolders`
+                applies to (only, if `folders` is missing).
+    seq : int
+        The sequence number of the payload.
+    accounts : dict
+        Only, if the accounts changed.
+    folders : list
+        Only, if the set of watched folders changed.
+    changedFolders : list
+        Only, if `folders` is missing: the folders whose data changed.
+
+The `Snapshot` keeps the last accounts and folders and completes the
+payloads. If a payload can not be completed, because the script missed the
+data it refers to (e.g. it has just been started), the script must reply with
+`ResyncRequired.reply`. The add-on then sends the complete payload again.
+
+This only makes sense for scripts, which keep running: connection based
+scripts or daemons (see `nativedaemon`).
+
+MIT License
+Copyright (C) 2026  The Scriptable Notifications contributors
+
+"""
+
+
+class ResyncRequired(Exception):
+    """The payload refers to data, which has not been received.
+
+    Attributes
+    ----------
+    reply : dict
+        The reply to send to the add-on to get the complete payload.
+    """
+
+    def __init__(self, payload, what):
+        super().__init__(f'Missing {what} for payload #{payload.get("seq")}')
+        self.reply = {'resync': payload.get('seq')}
+
+
+def folder_key(folder):
+    """Return the key of a folder: the account ID and the path."""
+    return f'{folder["accountId"]}{folder["path"]}'
+
+
+class Snapshot:
+    """The accounts and folders last received from the add-on.
+
+    Each completed payload gets its own list of `folders`, so that a payload
+    already passed to a handler is not changed by the later payloads. The
+    dictionaries of the accounts and the folders are shared between the
+    payloads: they are replaced, but never changed in place, and must not be
+    changed by the handlers.
+    """
+
+    def __init__(self):
+        self.accounts = None
+        self.accounts_version = None
+        self.folders = None
+        self.folders_version = None
+        # Index of each folder in `self.folders` by its key
+        self._index = {}
+
+    def apply(self, payload):
+        """Complete a delta encoded payload.
+
+        Payloads, which are not delta encoded, are returned unchanged.
+
+        Parameters
+        ----------
+        payload : object
+            The decoded payload.
+
+        Returns
+        -------
+        object
+            The payload with `accounts` and `folders`.
+
+        Raises
+        ------
+        ResyncRequired
+            If the payload refers to data, which has not been received.
+        """
+        if not isinstance(payload, dict) or 'version' not in payload:
+            return payload
+        version = payload.pop('version')
+
+        # Accounts
+        if 'accounts' in payload:
+            self.accounts = payload['accounts']
+            self.accounts_version = version['accounts']
+        elif self.accounts_version != version['accounts']:
+            raise ResyncRequired(payload, 'accounts')
+        else:
+            payload['accounts'] = self.accounts
+
+        # Folders
+        if 'folders' in payload:
+            self.folders = list(payload['folders'])
+            self._index = {
+                folder_key(folder): i
+                for i, folder in enumerate(self.folders)}
+        else:
+            if (self.folders_version is None
+                    or self.folders_version != version.get('foldersBase')):
+                raise ResyncRequired(payload, 'folders')
+            for folder in payload.pop('changedFolders', ()):
+                i = self._index.get(folder_key(folder))
+                if i is None:
+                    raise ResyncRequired(payload, 'folders')
+                self.folders[i] = folder
+            payload['folders'] = list(self.folders)
+        self.folders_version = version['folders']
+
+        payload.pop('seq', None)
+        return payload
@@ -0,0 +1,180 @@
+"""
+On-demand diagnostics of long-lived native scripts working with the
+"Scriptable Notifications" add-on for Thunderbird.
+
+A running script can be profiled and its memory inspected without restarting
+it:
+    SIGUSR1
+        The first signal starts `cProfile`, the next one stops it and writes
+        the statistics to "NAME-YYYYmmdd-HHMMSS.prof" next to the log file
+        "NAME.log". Look at them with `python3 -m pstats FILE.prof`.
+    SIGUSR2
+        The first signal starts `tracemalloc`, every following one writes the
+        `top` lines allocating the most memory (and the growth since the last
+        snapshot) to "NAME-YYYYmmdd-HHMMSS.tracemalloc.txt".
+
+For example:
+
+    $ kill -USR1 $(pgrep -f script-systemtrayicon.py)
+
+Usage
+=====
+
+    >>> diagnostics = nativediagnostics.Diagnostics('~/script.log')
+    >>> diagnostics.install(host.call_soon)
+
+The profiler only profiles the thread it was started in. Therefore the
+signals (which are always handled in the main thread) should be passed to the
+thread running the event loop, e.g. with `NativeHost.call_soon`.
+
+Signals are not available on Windows.
+
+MIT License
+Copyright (C) 2026  The Scriptable Notifications contributors
+
+"""
+
+import pathlib
+import signal
+import time
+
+
+# The number of lines written for a memory snapshot
+TOP = 25
+
+
+class Diagnostics:
+    """Toggle the profiler and write memory snapshots.
+
+    Parameters
+    ----------
+    path : path
+        The log file of the script. The diagnostics are written next to it.
+    top : int
+        The number of lines written for a memory snapshot. The default is
+        `TOP`.
+    frames : int
+        The number of frames stored by `tracemalloc` for each allocation.
+        The default is 1.
+    """
+
+    def __init__(self, path, top=TOP, frames=1):
+        self.path = pathlib.Path(path).expanduser()
+        self.top = top
+        self.frames = frames
+        self._profile = None
+        self._snapshot = None
+
+    @property
+    def profiling(self):
+        """`True`, if the profiler is running."""
+        return self._profile is not None
+
+    def install(self, call=None):
+        """Handle SIGUSR1 and SIGUSR2 (in the main thread).
+
+        Parameters
+        ----------
+        call : callable
+            Called with the diagnostic function (`toggle_profile` or
+            `snapshot_memory`), when a signal arrives, e.g. to run it in
+            another thread. The default is to run it directly.
+
+        Returns
+        -------
+        bool
+            `False`, if the platform does not support the signals.
+        """
+        if not hasattr(signal, 'SIGUSR1'):
+            return False
+
+        def handler(function):
+            def on_signal(signum, frame):
+                if call is None:
+                    function()
+                else:
+                    call(function)
+            return on_signal
+
+        signal.signal(signal.SIGUSR1, handler(self.toggle_profile))
+        signal.signal(signal.SIGUSR2, handler(self.snapshot_memory))
+        return True
+
+    def output(self, suffix):
+        """Return a new path next to the log file with `suffix`."""
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        return self.path.with_name(f'{self.path.stem}-{stamp}{suffix}')
+
+    def toggle_profile(self):
+        """Start the profiler or stop it and write its statistics.
+
+        Returns
+        -------
+        pathlib.Path|None
+            The file with the statistics, `None` if the profiler started.
+        """
+        if self._profile is None:
+            import cProfile
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError:
+                # Another profiler is running
+                self._profile = None
+                raise
+            return None
+        profile, self._profile = self._profile, None
+        profile.disable()
+        path = self.output('.prof')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profile.dump_stats(path)
+        return path
+
+    def snapshot_memory(self):
+        """Start tracing the memory or write the largest allocations.
+
+        Returns
+        -------
+        pathlib.Path|None
+            The file with the snapshot, `None` if the tracing started.
+        """
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._snapshot = None
+            return None
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [
+            f'# {time.strftime("%Y-%m-%dT%H:%M:%S%z")}: '
+            f'{current / 1024:.1f} KiB traced, peak {peak / 1024:.1f} KiB',
+            '',
+            f'# Top {self.top} lines',
+        ]
+        lines.extend(
+            str(stat) for stat in snapshot.statistics('lineno')[:self.top])
+        if self._snapshot is not None:
+            lines.extend(['', f'# Top {self.top} differences to the last '
+                              f'snapshot'])
+            lines.extend(
+                str(stat) for stat in
+                snapshot.compare_to(self._snapshot, 'lineno')[:self.top])
+        self._snapshot = snapshot
+
+        path = self.output('.tracemalloc.txt')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        return path
+
+    def close(self):
+        """Write the statistics of a running profiler and stop tracing."""
+        if self._profile is not None:
+            self.toggle_profile()
+        import tracemalloc
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._snapshot = None
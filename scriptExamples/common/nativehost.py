@@ -0,0 +1,485 @@
+"""
+An asyncio based runtime for connection based native scripts working with the
+"Scriptable Notifications" add-on for Thunderbird.
+
+The `NativeHost` reads the frames from the standard input with an
+`asyncio.StreamReader` and dispatches the payloads to coroutines, which are
+registered for the `event` of the payload ("start", "new", "read" or "quit",
+see `notifyNativeScript` in `src/background.js`).
+
+The payloads are passed from the reader to the handlers through a bounded
+queue. A slow handler does not stop the reader, until the queue is full. Then
+the reader waits for the handlers (backpressure), so that a flood of events
+can not use up all memory.
+
+Usage
+=====
+
+    >>> host = nativehost.NativeHost()
+
+    >>> @host.on('new')
+    ... async def on_new(payload):
+    ...     print(payload['message']['subject'])
+
+    >>> @host.on()
+    ... async def on_any(payload):
+    ...     print(payload['event'])
+
+    >>> asyncio.run(host.run())
+
+`run()` returns, when Thunderbird closes the connection or `stop()` is called.
+
+With `model=True`, the handlers get `nativepayload.Event` objects instead of
+the decoded JSON.
+
+Delta encoded payloads (see `nativedelta`) are completed, before they are
+passed to the handlers. Payloads, which can not be completed, are not passed
+to the handlers, but answered with a request to send the complete payload.
+
+If the payload contains a `trace` block (option "Measure the time from an
+event until the script has replied"), the reply contains the time (in ms) it
+took to decode and to handle the payload:
+    {"trace": {"id": <id of the trace>, "decode": <ms>, "handle": <ms>}}
+
+The host counts the events and measures the time to decode and to handle
+them in `metrics` (see `nativemetrics`). With `metrics_socket`, they are
+served on this UNIX socket, while the host is running.
+
+Instead of the standard input, `serve()` reads the frames from the
+connections to a UNIX socket. This is used by daemons, which are fed by a
+shim script in the connectionless mode (see `nativedaemon`).
+
+The runtime needs Python 3.7+. On Windows, asyncio can not read from the
+standard input pipe. There the frames are read by a
+`nativemessaging.Receiver` in a thread, which passes them to the event loop.
+`serve()` and `metrics_socket` need UNIX domain sockets and do not work on
+Windows.
+
+MIT License
+Copyright (C) 2026  The Scriptable Notifications contributors
+
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+
+import nativedelta
+import nativemessaging
+import nativemetrics
+import nativepayload
+
+
+# The events sent by the add-on in the "extended" mode
+EVENTS = ('start', 'new', 'read', 'quit')
+
+# Marks the end of the input in the queue
+_EOF = object()
+
+
+def print_exception(exc):
+    """Default error handler: print the traceback to the standard error."""
+    traceback.print_exception(type(exc), exc, exc.__traceback__)
+
+
+class NativeHost:
+    """Dispatch the events of the add-on to coroutine handlers.
+
+    Parameters
+    ----------
+    queue_size : int
+        The maximum number of payloads waiting for their handlers. The
+        default is 16.
+    workers : int
+        The number of payloads handled concurrently. With more than one
+        worker, the handlers of later events may run before the handlers of
+        earlier events have finished. The default is 1.
+    reply : object
+        The reply sent back for each payload, after it has been handled. Set
+        it to `None` to send no reply at all. The default is `'{}'`.
+    on_error : callable
+        Called with the exception, if a handler raises one. The default is
+        `print_exception`.
+    stdin : binary stream
+        The stream to read the frames from. The default is the standard
+        input.
+    stdout : binary stream
+        The stream to write the replies to. The default is the standard
+        output.
+    max_size : int
+        The largest frame accepted. The default is
+        `nativemessaging.MAX_MESSAGE_SIZE`.
+    metrics_socket : path
+        Serve the metrics on this UNIX socket, while running (unless another
+        process is serving on it). The default is `None` (not served).
+    model : bool
+        If `True`, the handlers get the extended payloads as
+        `nativepayload.Event` objects instead of dictionaries. The default is
+        `False`.
+
+    Attributes
+    ----------
+    snapshot : nativedelta.Snapshot
+        The accounts and folders last received.
+    metrics : nativemetrics.Metrics
+        The metrics of the host. More can be added by the script.
+    received : int
+        The number of payloads received.
+    handled : int
+        The number of payloads handled.
+    """
+
+    def __init__(self, queue_size=16, workers=1, reply='{}',
+                 on_error=print_exception, stdin=None, stdout=None,
+                 max_size=nativemessaging.MAX_MESSAGE_SIZE,
+                 metrics_socket=None, model=False):
+        self.queue_size = queue_size
+        self.workers = workers
+        self.reply = reply
+        self.on_error = on_error
+        self.stdin = sys.stdin.buffer if stdin is None else stdin
+        self.writer = nativemessaging.Writer(stdout)
+        self.max_size = max_size
+        self.snapshot = nativedelta.Snapshot()
+
+        self.received = 0
+        self.handled = 0
+
+        self.model = model
+        self.metrics_socket = metrics_socket
+        self.metrics = nativemetrics.Metrics()
+        self._events = self.metrics.counter(
+            'events_total', 'Events handled', ('event',))
+        self.metrics.counter(
+            'frames_received_total', 'Frames received',
+            function=lambda: self.received)
+        self._decode_seconds = self.metrics.summary(
+            'decode_seconds', 'Time to decode the payloads')
+        self._handle_seconds = self.metrics.summary(
+            'handle_seconds', 'Time to handle the payloads')
+        self.metrics.gauge(
+            'queue_depth', 'Payloads waiting for their handlers',
+            lambda: self.queue_depth)
+        self.metrics.gauge(
+            'resident_memory_bytes', 'Resident set size of the process',
+            nativemetrics.rss)
+        self._metrics_server = None
+
+        # Handlers by event, `None` for the handlers of all events
+        self._handlers = {}
+        self._loop = None
+        self._queue = None
+        self._tasks = []
+        # Open connections and the time of the last one (`serve()` only)
+        self._connections = None
+        self._last_activity = None
+
+    def on(self, *events):
+        """Decorator to register a coroutine as handler for `events`.
+
+        Without any event, the coroutine handles all events.
+        """
+        def decorator(coroutine):
+            self.add_handler(coroutine, *events)
+            return coroutine
+        return decorator
+
+    def add_handler(self, coroutine, *events):
+        """Register `coroutine` as handler for `events` (or all events)."""
+        if not asyncio.iscoroutinefunction(coroutine):
+            raise TypeError(f'{coroutine!r} is not a coroutine function')
+        for event in events or (None,):
+            self._handlers.setdefault(event, []).append(coroutine)
+
+    @property
+    def queue_depth(self):
+        """The number of payloads waiting for their handlers."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def run(self):
+        """Read and dispatch payloads until the standard input is closed."""
+        await self._setup()
+
+        if sys.platform == 'win32':
+            receiver = nativemessaging.Receiver(nativemessaging.Reader(
+                getattr(self.stdin, 'raw', self.stdin), self.max_size))
+            read = self._read_in_thread(receiver)
+            close = receiver.stop
+        else:
+            reader = asyncio.StreamReader(limit=nativemessaging.BUFFER_SIZE)
+            transport, _ = await self._loop.connect_read_pipe(
+                lambda: asyncio.StreamReaderProtocol(reader), self.stdin)
+            read = self._read(reader, self.writer.send)
+            close = transport.close
+
+        async def read_and_finish():
+            await read
+            await self._finish()
+
+        self._tasks = (
+            [asyncio.ensure_future(read_and_finish())]
+            + self._start_workers())
+        try:
+            await asyncio.gather(*self._tasks)
+        except asyncio.CancelledError:
+            # Stopped
+            pass
+        finally:
+            close()
+            self._teardown()
+
+    async def serve(self, path, idle_timeout=None):
+        """Accept connections on a UNIX socket and dispatch their payloads.
+
+        Each connection sends frames like Thunderbird does on the standard
+        input and gets the replies back on the same connection.
+
+        Parameters
+        ----------
+        path : path
+            The path of the UNIX socket. An existing file is replaced.
+        idle_timeout : float|None
+            Return, if no connection has been open for this many seconds.
+            If `None`, run until `stop()` is called.
+        """
+        await self._setup()
+        self._connections = 0
+        self._last_activity = self._loop.time()
+
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(
+            self._on_connection, path, limit=nativemessaging.BUFFER_SIZE)
+        os.chmod(path, 0o600)
+
+        self._tasks = self._start_workers()
+        if idle_timeout is not None:
+            self._tasks.append(
+                asyncio.ensure_future(self._watch_idle(idle_timeout)))
+        try:
+            await asyncio.gather(*self._tasks)
+        except asyncio.CancelledError:
+            # Stopped
+            pass
+        finally:
+            server.close()
+            if os.path.exists(path):
+                os.unlink(path)
+            self._teardown()
+
+    def stop(self):
+        """Stop running. This can be called from any thread."""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._cancel)
+
+    def call_soon(self, callback, *args):
+        """Call `callback(*args)` in the thread running the event loop.
+
+        This can be called from any thread. Returns `False`, if the host is
+        not running.
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return False
+        loop.call_soon_threadsafe(callback, *args)
+        return True
+
+    async def _setup(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(self.queue_size)
+        if self.metrics_socket is not None:
+            try:
+                self._metrics_server = await self.metrics.serve(
+                    self.metrics_socket)
+            except nativemetrics.SocketInUse:
+                # Another instance of the script serves its metrics
+                pass
+            except OSError as e:
+                # The metrics are not needed to run
+                self.on_error(e)
+
+    def _teardown(self):
+        if self._metrics_server is not None:
+            self._metrics_server.close()
+            self._metrics_server = None
+            if os.path.exists(self.metrics_socket):
+                os.unlink(self.metrics_socket)
+        self._loop = None
+
+    def _start_workers(self):
+        return [
+            asyncio.ensure_future(self._work())
+            for _ in range(self.workers)]
+
+    def _cancel(self):
+        for task in self._tasks:
+            task.cancel()
+
+    async def _finish(self):
+        """Let the workers finish the queued payloads and stop."""
+        for _ in range(self.workers):
+            await self._queue.put((_EOF, None))
+
+    async def _on_connection(self, reader, writer):
+        """Read the frames of a connection to the UNIX socket."""
+        def reply(msg):
+            if not writer.is_closing():
+                writer.write(
+                    nativemessaging.pack(nativemessaging.encode(msg)))
+
+        self._connections += 1
+        try:
+            await self._read(reader, reply)
+        finally:
+            self._connections -= 1
+            self._last_activity = self._loop.time()
+            writer.close()
+
+    async def _watch_idle(self, idle_timeout):
+        """Finish, when there has been no connection for `idle_timeout` s."""
+        while True:
+            idle = self._loop.time() - self._last_activity
+            if self._connections or not self._queue.empty():
+                idle = 0
+            elif idle >= idle_timeout:
+                break
+            await asyncio.sleep(idle_timeout - idle)
+        await self._finish()
+
+    async def _read(self, reader, reply):
+        """Read the frames and put the payloads into the queue.
+
+        `reply` is called with the reply, once the payload is handled.
+        """
+        header_size = nativemessaging.HEADER.size
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(header_size)
+                except asyncio.IncompleteReadError as e:
+                    if e.partial:
+                        raise EOFError('Stream closed inside a frame')
+                    break
+                length = nativemessaging.HEADER.unpack(header)[0]
+                if length > self.max_size:
+                    raise nativemessaging.FrameTooLarge(
+                        f'Frame of {length} bytes exceeds {self.max_size} '
+                        f'bytes')
+                try:
+                    frame = await reader.readexactly(length)
+                except asyncio.IncompleteReadError:
+                    raise EOFError('Stream closed inside a frame')
+                self.received += 1
+                # Waits, if the queue is full
+                await self._queue.put((frame, reply))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # A broken frame ends the input
+            self.on_error(e)
+
+    async def _read_in_thread(self, receiver):
+        """Read the frames with `receiver` in a thread (for Windows).
+
+        The thread passes the frames to the event loop with
+        `call_soon_threadsafe()` and waits, while the queue is full.
+        """
+        loop = self._loop
+        finished = loop.create_future()
+
+        def call(callback, *args):
+            try:
+                loop.call_soon_threadsafe(callback, *args)
+            except RuntimeError:
+                # The event loop is closed
+                return False
+            return True
+
+        def on_frame(frame):
+            # The frame is a view of the buffer of the reader, which is
+            # reused for the next frame
+            item = (bytes(frame), self.writer.send)
+            queued = threading.Event()
+
+            def put():
+                self.received += 1
+                task = loop.create_task(self._queue.put(item))
+                task.add_done_callback(lambda task: queued.set())
+
+            if not call(put):
+                receiver.stop()
+                return
+            # Backpressure: wait, until the payload is in the queue
+            queued.wait()
+
+        def on_finished():
+            if not finished.done():
+                finished.set_result(None)
+
+        def run():
+            try:
+                receiver.run(on_frame)
+            except Exception as e:
+                # A broken frame ends the input
+                call(self.on_error, e)
+            finally:
+                call(on_finished)
+
+        # A daemon thread: a blocked read must not keep the script running
+        threading.Thread(target=run, daemon=True).start()
+        await finished
+
+    async def _work(self):
+        """Take the payloads from the queue and call their handlers."""
+        while True:
+            frame, reply = await self._queue.get()
+            if frame is _EOF:
+                return
+            answer = self.reply
+            try:
+                start = time.perf_counter()
+                # The snapshot is updated before the first `await`, so the
+                # payloads are completed in the order they were received
+                payload = self.snapshot.apply(nativemessaging.decode(frame))
+                extended = isinstance(payload, dict)
+                if extended:
+                    event = payload.get('event', '')
+                    trace = payload.get('trace')
+                    if self.model:
+                        payload = nativepayload.Event.from_dict(payload)
+                decoded = time.perf_counter()
+                self._decode_seconds.observe(decoded - start)
+                await self.dispatch(payload)
+                handled = time.perf_counter()
+                self._handle_seconds.observe(handled - decoded)
+                if extended:
+                    self._events.inc(event=event)
+                    if answer is not None and isinstance(trace, dict):
+                        answer = nativemessaging.trace_reply(
+                            trace, start, decoded, handled)
+            except nativedelta.ResyncRequired as e:
+                answer = e.reply
+            except Exception as e:
+                self.on_error(e)
+            self.handled += 1
+            self._last_activity = self._loop.time()
+            if answer is not None:
+                reply(answer)
+
+    async def dispatch(self, payload):
+        """Call the handlers registered for the event of `payload`."""
+        handlers = self._handlers.get(None, [])
+        if isinstance(payload, nativepayload.Event):
+            event = payload.event
+        elif isinstance(payload, dict):
+            event = payload.get('event')
+        else:
+            event = None
+        if event is not None:
+            handlers = self._handlers.get(event, []) + handlers
+        for handler in handlers:
+            await handler(payload)
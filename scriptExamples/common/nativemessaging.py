@@ -0,0 +1,448 @@
+"""
+Native messaging framing for the scripts working with the "Scriptable
+Notifications" add-on for Thunderbird.
+
+Thunderbird talks to a native script over its standard input and output. Each
+message is a frame made of a 32 bit length (in native byte order) followed by
+that many bytes of UTF-8 encoded JSON. See
+https://developer.mozilla.org/en-US/docs/Mozilla/Add-ons/WebExtensions/Native_messaging
+
+The `Reader` reads the standard input into a buffer, which is reused for all
+frames. Short reads and frames split over several reads are handled. The
+frames are handed out as `memoryview` slices of this buffer, so the payload is
+never copied before it is decoded.
+
+The `Receiver` waits for frames without polling and stops, when Thunderbird
+closes the standard input.
+
+The `Writer` sends the length prefix and the body with a single write.
+
+If `orjson` is installed, the frames are decoded with it (it is several times
+faster than `json` for large payloads). Frames, which `orjson` rejects, are
+decoded with `json` again. `JSON_BACKEND` is the name of the module used.
+
+Usage
+=====
+
+Copy this file next to your script or keep the layout of the `scriptExamples`
+folder and add the `common` folder to the module search path:
+
+    >>> sys.path.insert(
+    ...     0, str(pathlib.Path(__file__).resolve().parents[2] / 'common'))
+    >>> import nativemessaging
+
+Connectionless scripts get one message and send the reply:
+
+    >>> payload = nativemessaging.get_message()
+    >>> nativemessaging.send_message('{}')
+
+Connection based scripts run a receiver until Thunderbird closes the
+connection:
+
+    >>> def on_frame(frame):
+    ...     payload = nativemessaging.decode(frame)
+    ...     nativemessaging.send_message('{}')
+    >>> nativemessaging.Receiver().run(on_frame)
+
+MIT License
+Copyright (C) 2026  The Scriptable Notifications contributors
+
+"""
+
+import json
+import os
+import selectors
+import struct
+import sys
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# The length prefix of every frame
+HEADER = struct.Struct('@I')
+_unpack_from = HEADER.unpack_from
+
+# Largest frame accepted from Thunderbird. Thunderbird itself allows up to
+# 4 GB, but no payload of the add-on comes close to this.
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+# Largest frame Thunderbird accepts from a native script
+MAX_REPLY_SIZE = 1024 * 1024
+
+# Initial size of the read buffer
+BUFFER_SIZE = 256 * 1024
+
+
+class FrameTooLarge(ValueError):
+    """The length prefix of a frame exceeds the allowed maximum."""
+
+
+class Reader:
+    """Read frames from a binary stream into a reused buffer.
+
+    Parameters
+    ----------
+    stream : binary stream
+        The stream to read from. It must provide `readinto()`, which is
+        called once for each read (short reads are fine). The default is the
+        unbuffered standard input.
+    max_size : int
+        The largest frame accepted. The default is `MAX_MESSAGE_SIZE`.
+    buffer_size : int
+        The initial size of the buffer. The buffer grows, if a frame does not
+        fit into it. The default is `BUFFER_SIZE`.
+
+    Attributes
+    ----------
+    frames : int
+        The number of frames read.
+    bytes_copied : int
+        The number of bytes moved inside the buffer (or into a larger buffer)
+        to make room for the rest of a partially read frame.
+    """
+
+    def __init__(self, stream=None, max_size=MAX_MESSAGE_SIZE,
+                 buffer_size=BUFFER_SIZE):
+        if stream is None:
+            stream = sys.stdin.buffer.raw
+        self.stream = stream
+        self.max_size = max_size
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        # Unread data is in `self._buffer[self._start:self._end]`
+        self._start = 0
+        self._end = 0
+
+        self.frames = 0
+        self.bytes_copied = 0
+
+    @property
+    def pending(self):
+        """The number of bytes read, but not yet returned as a frame."""
+        return self._end - self._start
+
+    def read_frame(self):
+        """Read the next frame.
+
+        Returns
+        -------
+        memoryview|None
+            The body of the frame. It is only valid until the next read,
+            because it points into the reused buffer. `None`, if the stream
+            is closed between two frames.
+
+        Raises
+        ------
+        FrameTooLarge
+            If the frame is larger than `max_size`.
+        EOFError
+            If the stream is closed in the middle of a frame.
+        """
+        while True:
+            frame = self.next_frame()
+            if frame is not None:
+                return frame
+            if not self.read_some():
+                if self.pending:
+                    raise EOFError('Stream closed inside a frame')
+                return None
+
+    def get(self):
+        """Read the next frame and decode the JSON in it.
+
+        Returns
+        -------
+        object|None
+            The decoded JSON, or `None` if the stream is closed.
+        """
+        frame = self.read_frame()
+        if frame is None:
+            return None
+        return decode(frame)
+
+    def next_frame(self):
+        """Return the next frame, if it has already been read completely.
+
+        This never reads from the stream.
+
+        Returns
+        -------
+        memoryview|None
+            The body of the frame or `None`, if it is not complete yet.
+        """
+        start = self._start
+        available = self._end - start
+        if available < HEADER.size:
+            return None
+        length = _unpack_from(self._buffer, start)[0]
+        if length > self.max_size:
+            raise FrameTooLarge(
+                f'Frame of {length} bytes exceeds {self.max_size} bytes')
+        if available < HEADER.size + length:
+            return None
+
+        begin = start + HEADER.size
+        end = begin + length
+        if end == self._end:
+            # Nothing left over - start again at the beginning of the buffer
+            self._start = self._end = 0
+        else:
+            self._start = end
+        self.frames += 1
+        return self._view[begin:end]
+
+    def read_some(self):
+        """Read once from the stream (this blocks until data is available).
+
+        Returns
+        -------
+        bool
+            `False`, if the stream is closed.
+        """
+        # Make room for the complete frame, if its length is already known
+        if self.pending >= HEADER.size:
+            size = HEADER.size + _unpack_from(self._buffer, self._start)[0]
+        else:
+            size = HEADER.size
+        self._reserve(size)
+        n = self.stream.readinto(self._view[self._end:])
+        if not n:
+            return False
+        self._end += n
+        return True
+
+    def _reserve(self, size):
+        """Make room behind the pending bytes for a frame of `size` bytes."""
+        if self._start + size <= len(self._buffer):
+            return
+        pending = self.pending
+        if size > len(self._buffer):
+            # Grow the buffer, so that several frames of this size fit into it
+            buffer = bytearray(max(4 * size, 2 * len(self._buffer)))
+            view = memoryview(buffer)
+            view[:pending] = self._view[self._start:self._end]
+            self._buffer, self._view = buffer, view
+        else:
+            # Move the pending bytes to the beginning of the buffer
+            self._view[:pending] = self._view[self._start:self._end]
+        self.bytes_copied += pending
+        self._start, self._end = 0, pending
+
+
+class Receiver:
+    """Wait for frames and pass them on, without polling.
+
+    The receiver sleeps in `select()` (or `epoll()`, `kqueue()`, whatever is
+    the best on the platform) until data arrives, the stream is closed or
+    `stop()` is called. There is no timeout, so an idle script is never woken
+    up, and each frame is handed on as soon as it is complete.
+
+    On Windows, `select()` does not work with pipes. There (and for regular
+    files) the receiver simply blocks in `read()`, and `stop()` only takes
+    effect after the next frame.
+
+    Parameters
+    ----------
+    reader : Reader
+        The reader for the frames. The default is a reader for the standard
+        input.
+    """
+
+    def __init__(self, reader=None):
+        if reader is None:
+            reader = Reader()
+        self.reader = reader
+        self._stopped = False
+        self._selector = None
+        if sys.platform != 'win32':
+            selector = selectors.DefaultSelector()
+            try:
+                selector.register(
+                    self.reader.stream, selectors.EVENT_READ, 'input')
+            except (OSError, ValueError):
+                # Regular files (e.g. stdin redirected from a file) cannot
+                # be waited for, but they never block either
+                selector.close()
+            else:
+                self._wakeup_read, self._wakeup_write = os.pipe()
+                selector.register(
+                    self._wakeup_read, selectors.EVENT_READ, 'wakeup')
+                self._selector = selector
+
+    def run(self, callback):
+        """Call `callback(frame)` for every frame received.
+
+        Returns, when the stream is closed or `stop()` is called.
+
+        Parameters
+        ----------
+        callback : callable
+            Called with the body of the frame (`memoryview`) as the only
+            argument.
+
+        Raises
+        ------
+        EOFError
+            If the stream is closed in the middle of a frame.
+        """
+        try:
+            if self._selector is None:
+                self._run_blocking(callback)
+            else:
+                self._run_selector(callback)
+        finally:
+            self.close()
+
+    def stop(self):
+        """Make `run()` return. This can be called from any thread."""
+        self._stopped = True
+        if self._selector is not None:
+            try:
+                os.write(self._wakeup_write, b'\0')
+            except OSError:
+                # Already closed
+                pass
+
+    def close(self):
+        """Release the selector and the wake-up pipe."""
+        if self._selector is not None:
+            self._selector.close()
+            self._selector = None
+            os.close(self._wakeup_read)
+            os.close(self._wakeup_write)
+
+    def _run_selector(self, callback):
+        reader = self.reader
+        while not self._stopped:
+            for key, _ in self._selector.select():
+                if key.data == 'wakeup':
+                    return
+                if not reader.read_some():
+                    if reader.pending:
+                        raise EOFError('Stream closed inside a frame')
+                    return
+                frame = reader.next_frame()
+                while frame is not None and not self._stopped:
+                    callback(frame)
+                    frame = reader.next_frame()
+
+    def _run_blocking(self, callback):
+        while not self._stopped:
+            frame = self.reader.read_frame()
+            if frame is None:
+                return
+            callback(frame)
+
+
+class Writer:
+    """Write frames to a binary stream.
+
+    Parameters
+    ----------
+    stream : binary stream
+        The stream to write to. The default is the standard output.
+    max_size : int
+        The largest frame, which may be sent. The default is
+        `MAX_REPLY_SIZE`.
+    """
+
+    def __init__(self, stream=None, max_size=MAX_REPLY_SIZE):
+        if stream is None:
+            stream = sys.stdout.buffer
+        self.stream = stream
+        self.max_size = max_size
+
+    def write_frame(self, body):
+        """Send `body` (bytes) with its length prefix as one write."""
+        if len(body) > self.max_size:
+            raise FrameTooLarge(
+                f'Frame of {len(body)} bytes exceeds {self.max_size} bytes')
+        self.stream.write(pack(body))
+        self.stream.flush()
+
+    def send(self, msg):
+        """Encode `msg` as JSON and send it."""
+        self.write_frame(encode(msg))
+
+
+def pack(body):
+    """Return the frame for `body` (bytes), the length prefix included."""
+    return HEADER.pack(len(body)) + body
+
+
+def decode(frame):
+    """Decode the JSON in a frame (bytes or memoryview)."""
+    return json.loads(str(frame, 'utf-8'))
+
+
+if orjson is not None:
+    def decode(frame):  # noqa: F811
+        """Decode the JSON in a frame (bytes or memoryview) with `orjson`.
+
+        `orjson` rejects some JSON, which `json` accepts (e.g. a lone
+        surrogate like "\\ud83d" in a truncated subject). Such frames are
+        decoded with `json`.
+        """
+        try:
+            return orjson.loads(frame)
+        except orjson.JSONDecodeError:
+            return json.loads(str(frame, 'utf-8'))
+
+
+# The module decoding the frames
+JSON_BACKEND = 'json' if orjson is None else 'orjson'
+
+
+def encode(msg):
+    """Encode `msg` as JSON for sending it in a frame."""
+    return json.dumps(msg).encode('utf-8')
+
+
+def trace_reply(trace, start, decoded, handled):
+    """Return the reply to a payload with a `trace` block.
+
+    Parameters
+    ----------
+    trace : dict
+        The `trace` block of the payload.
+    start, decoded, handled : float
+        The times (`time.perf_counter()`) when decoding started, when it was
+        finished and when the payload was handled.
+    """
+    return {'trace': {
+        'id': trace.get('id'),
+        'decode': (decoded - start) * 1000,
+        'handle': (handled - decoded) * 1000}}
+
+
+#
+# Default reader and writer for the standard input and output
+#
+
+_reader = None
+_writer = None
+
+
+def get_message():
+    """Get the next message from the standard input.
+
+    Returns
+    -------
+    object|None
+        The decoded message, or `None` if Thunderbird closed the connection.
+    """
+    global _reader
+    if _reader is None:
+        _reader = Reader()
+    return _reader.get()
+
+
+def send_message(msg):
+    """Send a message to the standard output."""
+    global _writer
+    if _writer is None:
+        _writer = Writer()
+    _writer.send(msg)
@@ -0,0 +1,264 @@
+"""
+Counters and gauges of long-lived native scripts working with the
+"Scriptable Notifications" add-on for Thunderbird.
+
+The metrics are exposed in the Prometheus text format on a UNIX socket (see
+`nativedaemon.metrics_path()`), which answers HTTP requests:
+
+    $ SOCKET=$XDG_RUNTIME_DIR/scriptable-notifications/NAME.metrics
+    $ curl --unix-socket $SOCKET http://localhost/metrics
+
+or with `dump()` (used by the `--metrics` command line argument of the
+scripts).
+
+Only one process serves its metrics on a socket: `serve()` raises
+`SocketInUse`, if another process is still serving on it. A socket left
+behind by a process, which has crashed, is replaced.
+
+Usage
+=====
+
+    >>> metrics = nativemetrics.Metrics()
+    >>> events = metrics.counter('events_total', 'Events', ('event',))
+    >>> events.inc(event='new')
+    >>> metrics.gauge('rss_bytes', 'Resident set size', nativemetrics.rss)
+    >>> server = await metrics.serve(path)
+
+This only works with UNIX domain sockets, that is not on Windows.
+
+MIT License
+Copyright (C) 2026  The Scriptable Notifications contributors
+
+"""
+
+import os
+import sys
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Time to wait for the request of a client
+REQUEST_TIMEOUT = 5
+
+
+class SocketInUse(OSError):
+    """Another process serves its metrics on the socket."""
+
+
+def rss():
+    """Return the resident set size of this process in bytes."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    # The peak (the current size is not available), in bytes on macOS and
+    # in KiB on Linux
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return f'{{{pairs}}}'
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', '\\\\').replace('"', '\\"')
+        .replace('\n', '\\n'))
+
+
+class Counter:
+    """A value, which only increases, optionally by labels.
+
+    Instead of increasing it, a `function` can return its value.
+    """
+
+    type = 'counter'
+
+    def __init__(self, name, help, labels=(), function=None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.function = function
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = tuple(labels.get(name, '') for name in self.labels)
+        return self._values.get(key, 0)
+
+    def samples(self):
+        if self.function is not None:
+            yield self.name, '', self.function()
+            return
+        for key, value in self._values.items():
+            yield self.name, _labels(self.labels, key), value
+
+
+class Gauge:
+    """A value, which can go up and down, or a function returning it."""
+
+    type = 'gauge'
+
+    def __init__(self, name, help, function=None):
+        self.name = name
+        self.help = help
+        self.function = function
+        self._value = 0
+
+    def set(self, value):
+        self._value = value
+
+    def value(self):
+        return self._value if self.function is None else self.function()
+
+    def samples(self):
+        yield self.name, '', self.value()
+
+
+class Summary:
+    """The number and the sum of observations (e.g. durations)."""
+
+    type = 'summary'
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+
+    def samples(self):
+        yield f'{self.name}_count', '', self.count
+        yield f'{self.name}_sum', '', self.sum
+
+
+class Metrics:
+    """A registry of metrics.
+
+    Parameters
+    ----------
+    prefix : str
+        Prepended (with an underscore) to the names of all metrics.
+    """
+
+    def __init__(self, prefix='scriptable_notifications'):
+        self.prefix = prefix
+        self._metrics = {}
+
+    def _add(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def _name(self, name):
+        return f'{self.prefix}_{name}' if self.prefix else name
+
+    def counter(self, name, help, labels=(), function=None):
+        """Register and return a `Counter` (with a function to get its value).
+        """
+        return self._add(Counter(self._name(name), help, labels, function))
+
+    def gauge(self, name, help, function=None):
+        """Register and return a `Gauge` (with a function to get its value)."""
+        return self._add(Gauge(self._name(name), help, function))
+
+    def summary(self, name, help):
+        """Register and return a `Summary`."""
+        return self._add(Summary(self._name(name), help))
+
+    def render(self):
+        """Return all metrics in the Prometheus text format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {value}')
+        return '\n'.join(lines) + '\n'
+
+    async def serve(self, path):
+        """Answer the HTTP requests on the UNIX socket `path` with the metrics.
+
+        Returns
+        -------
+        asyncio.AbstractServer
+            The server, which must be closed.
+
+        Raises
+        ------
+        SocketInUse
+            If another process is serving on `path`.
+        """
+        import asyncio
+
+        async def on_connection(reader, writer):
+            try:
+                # Read the request (up to the empty line) and ignore it
+                await asyncio.wait_for(
+                    reader.readuntil(b'\r\n\r\n'), REQUEST_TIMEOUT)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError,
+                    asyncio.LimitOverrunError):
+                pass
+            body = self.render().encode('utf-8')
+            writer.write(
+                f'HTTP/1.0 200 OK\r\n'
+                f'Content-Type: {CONTENT_TYPE}\r\n'
+                f'Content-Length: {len(body)}\r\n\r\n'.encode('ascii')
+                + body)
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+            writer.close()
+
+        if os.path.exists(path):
+            if _accepts(path):
+                raise SocketInUse(f'{path} is served by another process')
+            # Left behind by a process, which has crashed
+            os.unlink(path)
+        server = await asyncio.start_unix_server(on_connection, path)
+        os.chmod(path, 0o600)
+        return server
+
+
+def _accepts(path):
+    """Return `True`, if a process accepts connections on `path`."""
+    import socket
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(path))
+        except OSError:
+            return False
+    return True
+
+
+def dump(path, timeout=REQUEST_TIMEOUT):
+    """Return the metrics served on the UNIX socket `path`."""
+    import socket
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(str(path))
+        sock.sendall(b'GET /metrics HTTP/1.0\r\n\r\n')
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    response = b''.join(chunks).decode('utf-8')
+    return response.split('\r\n\r\n', 1)[-1]
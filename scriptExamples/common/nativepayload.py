@@ -0,0 +1,276 @@
+"""
+A typed model of the extended payloads of the "Scriptable Notifications"
+add-on for Thunderbird.
+
+The classes mirror what `notifyNativeScript` in `src/background.js` sends in
+the "extended" mode (the JavaScript names are converted to Python names,
+e.g. `unreadMessageCount` becomes `unread_message_count`):
+    Event
+        The payload with the `event`, the `accounts`, the `folders`, the
+        last `message` and all `messages`.
+    Account, Identity
+        The accounts (by their ID) and their identities.
+    Folder
+        The folders checked for unread messages and the folder of each
+        message. `key` is the ID of the folder (`accountId` + `path`), which
+        is used by the scripts to identify the folders.
+    MessageDetails
+        The new or read messages.
+
+The classes use `__slots__`, so their objects are small and the attributes
+are fast to access. The payload is validated once, while the objects are
+built; a payload, which does not match the model, raises `PayloadError`.
+
+Usage
+=====
+
+    >>> event = nativepayload.decode(frame)
+    >>> for message in event.messages:
+    ...     print(message.folder.key, message.subject)
+
+or with a payload already decoded (e.g. completed by `nativedelta`):
+
+    >>> event = nativepayload.Event.from_dict(payload)
+
+`NativeHost(model=True)` passes `Event` objects to the handlers.
+
+MIT License
+Copyright (C) 2026  The Scriptable Notifications contributors
+
+"""
+
+import nativemessaging
+
+
+# The events sent by the add-on in the "extended" mode
+EVENTS = ('start', 'new', 'read', 'quit')
+
+
+class PayloadError(ValueError):
+    """The payload does not match the model."""
+
+
+def _invalid(name, value, expected):
+    raise PayloadError(f'{name} is not {expected}: {value!r}')
+
+
+class _Model:
+    """Common methods of the model classes."""
+
+    __slots__ = ()
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name)
+            for name in self.__slots__)
+
+    def __repr__(self):
+        fields = ', '.join(
+            f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'{self.__class__.__name__}({fields})'
+
+    @classmethod
+    def from_dict(cls, d):
+        """Return the object for the decoded JSON object `d`."""
+        try:
+            return cls._from_dict(d)
+        except KeyError as e:
+            raise PayloadError(
+                f'{cls.__name__}: missing key {e.args[0]!r}') from None
+        except (TypeError, AttributeError) as e:
+            raise PayloadError(f'{cls.__name__}: {e}') from None
+
+
+class Identity(_Model):
+    """An identity of an account."""
+
+    __slots__ = ('email', 'label', 'name', 'organization')
+
+    def __init__(self, email, label='', name='', organization=''):
+        self.email = email
+        self.label = label
+        self.name = name
+        self.organization = organization
+
+    @classmethod
+    def _from_dict(cls, d):
+        email = d['email']
+        if type(email) is not str:
+            _invalid('email', email, 'a string')
+        get = d.get
+        return cls(
+            email, get('label', ''), get('name', ''), get('organization', ''))
+
+
+class Account(_Model):
+    """An account with its identities."""
+
+    __slots__ = ('id', 'name', 'type', 'identities')
+
+    def __init__(self, id, name, type=None, identities=()):
+        self.id = id
+        self.name = name
+        self.type = type
+        self.identities = list(identities)
+
+    @classmethod
+    def _from_dict(cls, d, id=None):
+        name = d['name']
+        if type(name) is not str:
+            _invalid('name', name, 'a string')
+        identity = Identity._from_dict
+        return cls(
+            id, name, d.get('type'),
+            [identity(i) for i in d.get('identities', ())])
+
+
+class Folder(_Model):
+    """A folder (the counts are `None` for the folder of a message)."""
+
+    __slots__ = (
+        'key', 'account_id', 'path', 'name', 'type', 'favorite',
+        'total_message_count', 'unread_message_count', 'seen_message_count')
+
+    def __init__(self, account_id, path, name=None, type=None,
+                 favorite=False, total_message_count=None,
+                 unread_message_count=None, seen_message_count=None):
+        self.key = account_id + path
+        self.account_id = account_id
+        self.path = path
+        self.name = name
+        self.type = type
+        self.favorite = favorite
+        self.total_message_count = total_message_count
+        self.unread_message_count = unread_message_count
+        self.seen_message_count = seen_message_count
+
+    @classmethod
+    def _from_dict(cls, d):
+        # The type checks are inlined: there are many folders in a payload
+        account_id = d['accountId']
+        if type(account_id) is not str:
+            _invalid('accountId', account_id, 'a string')
+        path = d['path']
+        if type(path) is not str:
+            _invalid('path', path, 'a string')
+        get = d.get
+        unread = get('unreadMessageCount')
+        if unread is not None and type(unread) is not int:
+            _invalid('unreadMessageCount', unread, 'an integer')
+        return cls(
+            account_id, path, get('name'), get('type'),
+            get('favorite', False), get('totalMessageCount'), unread,
+            get('seenMessageCount'))
+
+
+class MessageDetails(_Model):
+    """A new or read message."""
+
+    __slots__ = (
+        'message_id', 'folder', 'author', 'subject', 'date', 'read',
+        'flagged', 'junk', 'junk_score', 'headers_only', 'size', 'tags',
+        'cc_list', 'bcc_list')
+
+    def __init__(self, message_id, folder, author=None, subject=None,
+                 date=None, read=False, flagged=False, junk=False,
+                 junk_score=0, headers_only=False, size=None, tags=(),
+                 cc_list=(), bcc_list=()):
+        self.message_id = message_id
+        self.folder = folder
+        self.author = author
+        self.subject = subject
+        self.date = date
+        self.read = read
+        self.flagged = flagged
+        self.junk = junk
+        self.junk_score = junk_score
+        self.headers_only = headers_only
+        self.size = size
+        self.tags = tags
+        self.cc_list = cc_list
+        self.bcc_list = bcc_list
+
+    @classmethod
+    def _from_dict(cls, d):
+        message_id = d['messageId']
+        if type(message_id) is not str:
+            _invalid('messageId', message_id, 'a string')
+        get = d.get
+        return cls(
+            message_id, Folder._from_dict(d['folder']),
+            get('author'), get('subject'), get('date'), get('read', False),
+            get('flagged', False), get('junk', False), get('junkScore', 0),
+            get('headersOnly', False), get('size'), get('tags') or [],
+            get('ccList') or [], get('bccList') or [])
+
+
+class Event(_Model):
+    """An extended payload.
+
+    Attributes
+    ----------
+    event : str
+        "start", "new", "read" or "quit".
+    accounts : dict
+        The `Account` objects by their ID.
+    folders : list
+        The `Folder` objects in the order of the add-on.
+    message : MessageDetails|None
+        The last message.
+    messages : list
+        All `MessageDetails` (several for a "new" event, none for the
+        "start" event).
+    trace : dict|None
+        The `trace` block (see `nativemessaging.trace_reply()`).
+    """
+
+    __slots__ = ('event', 'accounts', 'folders', 'message', 'messages',
+                 'trace')
+
+    def __init__(self, event, accounts=None, folders=(), message=None,
+                 messages=None, trace=None):
+        self.event = event
+        self.accounts = {} if accounts is None else accounts
+        self.folders = list(folders)
+        self.message = message
+        if messages is None:
+            messages = [] if message is None else [message]
+        self.messages = messages
+        self.trace = trace
+
+    @classmethod
+    def _from_dict(cls, d):
+        event = d['event']
+        if event not in EVENTS:
+            raise PayloadError(f'Unknown event: {event!r}')
+        account = Account._from_dict
+        folder = Folder._from_dict
+        details = MessageDetails._from_dict
+        accounts = {
+            id: account(a, id) for id, a in d.get('accounts', {}).items()}
+        folders = [folder(f) for f in d.get('folders', ())]
+        if 'messages' in d:
+            messages = [details(m) for m in d['messages']]
+            # `message` is the last of the `messages`
+            message = messages[-1] if messages else None
+        else:
+            # Sent by older versions of the add-on
+            message = d.get('message')
+            message = None if message is None else details(message)
+            messages = None
+        return cls(event, accounts, folders, message, messages,
+                   d.get('trace'))
+
+
+def decode(frame):
+    """Decode a frame (bytes or memoryview) into an `Event`.
+
+    The JSON is decoded by `nativemessaging.decode()` (with `orjson`, if it
+    is installed).
+    """
+    payload = nativemessaging.decode(frame)
+    if not isinstance(payload, dict):
+        raise PayloadError(f'Not an extended payload: {payload!r}')
+    return Event.from_dict(payload)
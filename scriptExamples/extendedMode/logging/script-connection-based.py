@@ -5,56 +5,60 @@ add-on for Thunderbird.
 
 This script receives the extended message from the add-on and writes it to a
 log file in the user's home directory. The file has the same basename as this
-script, but the suffix ".log".
+script, but the suffix ".log". Each event is a line with a JSON object (see
+`scriptExamples/common/eventlog.py`), which can be pretty printed with
+`python3 -m json.tool --json-lines ~/script-connection-based.log`.
+
+While it is running, `script-connection-based.py --metrics` prints its
+counters and gauges (see `scriptExamples/common/nativemetrics.py`).
 
 MIT License
 Copyright (C) 2022  Stephan Helma
 
 """
 
-import json
+import asyncio
 import pathlib
-import pprint
 import signal
-import struct
 import sys
-import time
 import traceback
 
+# The shared helper modules are in the folder `scriptExamples/common`
+sys.path.insert(
+    0, str(pathlib.Path(__file__).resolve().parents[2] / 'common'))
+import eventlog  # noqa: E402
+import nativehost  # noqa: E402
+
 
 LOGFILE = pathlib.Path(
     '~', pathlib.Path(__file__).with_suffix('.log').name
     ).expanduser()
 
+# Rotate the log file at this size, keep this many (gzipped) old files
+LOG_MAX_BYTES = eventlog.MAX_BYTES
+LOG_BACKUPS = eventlog.BACKUPS
+LOG_COMPRESS = True
+
+# Serve the metrics on a UNIX socket (not on Windows)
+METRICS = True
+
 
 #
 # Helper functions
 #
 
-def get_message():
-    """Get message from the standard input."""
-    raw_length = sys.stdin.buffer.read(4)
-    if len(raw_length) == 0:
-        return {}
-    length = struct.unpack('@I', raw_length)[0]
-    message = sys.stdin.buffer.read(length).decode('utf-8')
-    return message
-
-
-def send_message(msg):
-    """Send message to the standard output."""
-    content = f'"{msg}"'.encode('utf-8')
-    length = struct.pack('@I', len(content))
-    sys.stdout.buffer.write(length)
-    sys.stdout.buffer.write(content)
-    sys.stdout.buffer.flush()
+def metrics_socket():
+    """Return the UNIX socket serving the metrics (or `None`)."""
+    import socket
+    if not METRICS or not hasattr(socket, 'AF_UNIX'):
+        return None
+    import nativedaemon
+    return nativedaemon.metrics_path(pathlib.Path(__file__).stem)
 
 
 def on_sigterm(signum, frame):
-    with open(LOGFILE, 'a') as log:
-        print(f'\n====== {time.asctime()} ======', file=log, flush=True)
-        print(f'****** stdin closed ******', file=log, flush=True)
-        exit(0)
+    # Closing stdin ends `host.run()` and the log is closed
+    raise SystemExit(0)
 
 
 #
@@ -62,37 +66,40 @@ def on_sigterm(signum, frame):
 #
 
 def main():
+    if sys.argv[1:] == ['--metrics']:
+        # Print the metrics of the running script
+        import nativemetrics
+        try:
+            print(nativemetrics.dump(metrics_socket()), end='')
+        except (OSError, TypeError) as e:
+            sys.exit(f'No metrics: {e}')
+        return
+
     signal.signal(signal.SIGTERM, on_sigterm)
 
-    with open(LOGFILE, 'a') as log:
-        print(f'****** stdin opened ******', file=log, flush=True)
-        while True:
-            try:
-                # Get message sent
-                message = get_message()
-                if not message:
-                    print(file=log, flush=True, end='.')
-                    time.sleep(1)
-                    continue
-
-                # Parse the message
-                payload = json.loads(message)
-
-                # (Pretty) print to logfile
-                print(f'\n====== {time.asctime()} ======', file=log, flush=True)
-                pp = pprint.PrettyPrinter(stream=log)
-                pp.pprint(payload)
-                print('======', file=log, flush=True)
-
-                # Send back required message
-                send_message({})
-
-            except Exception as e:
-                # If anything goes wrong, write the traceback to the logfile
-                print(
-                    f'EXCEPTION: '
-                    f'{"".join(traceback.format_exception(type(e), e, e.__traceback__))}',
-                    file=log, flush=True)
+    with eventlog.EventLog(
+            LOGFILE, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS,
+            compress=LOG_COMPRESS) as log:
+
+        def log_exception(e):
+            # If anything goes wrong, write the traceback to the logfile
+            log.write(eventlog.record(exception=''.join(
+                traceback.format_exception(type(e), e, e.__traceback__))))
+
+        host = nativehost.NativeHost(
+            on_error=log_exception, metrics_socket=metrics_socket())
+
+        @host.on()
+        async def on_event(payload):
+            log.write(eventlog.record(payload=payload))
+
+        log.write(eventlog.record(status='stdin opened'))
+        try:
+            # Sleep until a message arrives, return when stdin is closed. The
+            # host sends back the required message after each event.
+            asyncio.run(host.run())
+        finally:
+            log.write(eventlog.record(status='stdin closed'))
 
 
 if __name__ == '__main__':
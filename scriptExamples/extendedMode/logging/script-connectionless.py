@@ -5,76 +5,81 @@ add-on for Thunderbird.
 
 This script receives the extended message from the add-on and writes it to a
 log file in the user's home directory. The file has the same basename as this
-script, but the suffix ".log".
+script, but the suffix ".log". Each event is a line with a JSON object (see
+`scriptExamples/common/eventlog.py`), which can be pretty printed with
+`python3 -m json.tool --json-lines ~/script-connectionless.log`.
+
+As this script is started for every event, it can not keep the accounts and
+folders of delta encoded payloads (see `scriptExamples/common/nativedelta.py`).
+It logs such a payload and asks the add-on to send the complete payload.
 
 MIT License
 Copyright (C) 2022  Stephan Helma
 
 """
 
-import json
 import pathlib
-import pprint
-import struct
 import sys
 import time
 import traceback
 
+# The shared helper modules are in the folder `scriptExamples/common`
+sys.path.insert(
+    0, str(pathlib.Path(__file__).resolve().parents[2] / 'common'))
+import eventlog  # noqa: E402
+import nativedelta  # noqa: E402
+import nativemessaging  # noqa: E402
+
 
 LOGFILE = pathlib.Path(
     '~', pathlib.Path(__file__).with_suffix('.log').name
     ).expanduser()
 
+# Rotate the log file at this size, keep this many (gzipped) old files
+LOG_MAX_BYTES = eventlog.MAX_BYTES
+LOG_BACKUPS = eventlog.BACKUPS
+LOG_COMPRESS = True
 
-#
-# Helper functions
-#
-
-def get_message():
-    """Get message from the standard input."""
-    raw_length = sys.stdin.buffer.read(4)
-    if len(raw_length) == 0:
-        return {}
-    length = struct.unpack('@I', raw_length)[0]
-    message = sys.stdin.buffer.read(length).decode('utf-8')
-    return message
-
-
-def send_message(msg):
-    """Send message to the standard output."""
-    content = f'"{msg}"'.encode('utf-8')
-    length = struct.pack('@I', len(content))
-    sys.stdout.buffer.write(length)
-    sys.stdout.buffer.write(content)
-    sys.stdout.buffer.flush()
 
 #
 # Main function
 #
 
 def main():
-    with open(LOGFILE, 'a') as f:
+    with eventlog.EventLog(
+            LOGFILE, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS,
+            compress=LOG_COMPRESS) as log:
         try:
-            # Get message sent
-            message = get_message()
-
-            # Parse the message
-            payload = json.loads(message)
-
-            # (Pretty) print to logfile
-            print(f'====== {time.asctime()} ======', file=f)
-            pp = pprint.PrettyPrinter(stream=f)
-            pp.pprint(payload)
-
-            # Send back required message
-            send_message({})
+            # Get and parse the message sent
+            frame = nativemessaging.Reader().read_frame()
+            if frame is None:
+                raise EOFError('stdin closed without a message')
+            start = time.perf_counter()
+            payload = nativemessaging.decode(frame)
+            decoded = time.perf_counter()
+
+            # Write to logfile (when the log is closed)
+            log.write(eventlog.record(payload=payload))
+
+            # Send back required message (or ask for the complete payload)
+            try:
+                nativedelta.Snapshot().apply(payload)
+            except nativedelta.ResyncRequired as e:
+                log.write(eventlog.record(incomplete=str(e)))
+                nativemessaging.send_message(e.reply)
+            else:
+                if (isinstance(payload, dict)
+                        and isinstance(payload.get('trace'), dict)):
+                    nativemessaging.send_message(nativemessaging.trace_reply(
+                        payload['trace'], start, decoded,
+                        time.perf_counter()))
+                else:
+                    nativemessaging.send_message('{}')
 
         except Exception as e:
             # If anything goes wrong, write the traceback to the logfile
-            print(
-                f'EXCEPTION: '
-                f'{"".join(traceback.format_exception(type(e), e, e.__traceback__))}',
-                file=f)
+            log.write(eventlog.record(exception=''.join(
+                traceback.format_exception(type(e), e, e.__traceback__))))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Shim to use `script-systemtrayicon.py` in the connectionless mode of the
+"Scriptable Notifications" add-on for Thunderbird.
+
+Register this script in Thunderbird instead of `script-systemtrayicon.py`. It
+starts `script-systemtrayicon.py --daemon` (if it is not running yet) and
+forwards each event to it over a UNIX socket. The shim only imports a few
+standard modules, so it starts much faster than the system tray script.
+
+MIT License
+Copyright (C) 2026  The Scriptable Notifications contributors
+
+"""
+
+import pathlib
+import sys
+
+# The shared helper modules are in the folder `scriptExamples/common`
+sys.path.insert(
+    0, str(pathlib.Path(__file__).resolve().parents[2] / 'common'))
+import nativedaemon  # noqa: E402
+
+
+# Must be the same as `DAEMON` in `script-systemtrayicon.py`
+DAEMON = 'script-systemtrayicon'
+
+
+if __name__ == '__main__':
+    nativedaemon.shim(DAEMON, [
+        sys.executable,
+        str(pathlib.Path(__file__).with_name('script-systemtrayicon.py')),
+        '--daemon'])
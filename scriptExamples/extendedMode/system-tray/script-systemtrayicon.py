@@ -25,6 +25,11 @@ This script
     2. `[Pillow](https://pypi.org/project/Pillow/)` – to generate the icons
        used
 2. Copy this script to a place, where Thunderbird (next step) can find it.
+   Keep the layout of the `scriptExamples` folder, or copy all modules of
+   the folder `scriptExamples/common` next to this script. (It imports
+   `nativehost`, `nativemessaging`, `nativedelta`, `nativemetrics`,
+   `nativepayload` and `flightrecorder`, and `nativedaemon` and
+   `nativediagnostics`, if the daemon or the diagnostics are used.)
 3. Make it executable.
 4. Configure it with the help of the `CONFIG` dictionary (see below).
 
@@ -40,6 +45,16 @@ Thunderbird
     3. Select "Connection based" in the section "Type of data connection".
     4. Select the mail folders to monitor.
 
+Connectionless mode
+...................
+
+In the connectionless mode, Thunderbird would start this script for every
+event, and the icon would vanish right away. Instead, register the shim
+`script-systemtrayicon-shim.py` (in the same folder) in Thunderbird and
+select "Connectionless". The shim starts this script as a daemon (with the
+command line argument `--daemon`) and forwards the events to it over a UNIX
+socket (not available on Windows).
+
 
 Usage
 =====
@@ -98,6 +113,53 @@ following options are available:
         "(255, 0, 0, 127)" for a semi-transparent red. These colors are used to
         replace the fill color (`PostHorn._fill`) and the outline color
         (`PostHorn._outline`).
+    'daemon_idle_timeout' : float|None
+        Only used, if the script runs as a daemon for the connectionless mode
+        (see above): The daemon exits (and the icon vanishes), if there have
+        been no events for this many seconds. Set to `None` to keep it
+        running.
+    'icon_cache' : True|False
+        If `True`, the icons are stored in the user's cache directory
+        (e.g. "~/.cache/scriptable-notifications" on Linux), once they have
+        been generated from the colors above. The next start just loads them.
+        The cache is renewed, if the icon or the colors change.
+    'state' : True|False
+        If `True`, the new messages are stored in the user's state directory
+        (e.g. "~/.local/state/scriptable-notifications" on Linux). When the
+        script is started again, it shows the stored messages right away,
+        until Thunderbird sends the "start" event. Then the folders without
+        any unread message are cleared.
+    'max_messages' : int
+        The maximum number of new messages remembered per folder. If more
+        messages arrive, the oldest are forgotten, but still counted. (A
+        forgotten message, which is sent again, is counted twice.)
+    'update_window' : float|None
+        The events arriving within this many seconds after an event are
+        merged into one update of the system tray icon (its title, image,
+        visibility and notification). This avoids flickering and floods of
+        the desktop environment, when many events arrive. Set to `None` (or
+        `0`) to update the icon for every event.
+    'metrics' : True|False
+        If `True`, the counters and gauges of the running script (events by
+        type, time to decode and handle them, time to update the icon, queue
+        depth, memory, new and remembered messages) are served in the
+        Prometheus text format on a UNIX socket in the user's runtime
+        directory (not on Windows). Show them with
+            $ script-systemtrayicon.py --metrics
+    'diagnostics' : True|False
+        If `True`, the running script can be diagnosed with signals (not on
+        Windows): SIGUSR1 starts the profiler, the next SIGUSR1 stops it and
+        writes its statistics ("script-systemtrayicon-<time>.prof") next to
+        the log file. SIGUSR2 starts tracing the memory allocations, the
+        next ones write the largest allocations
+        ("script-systemtrayicon-<time>.tracemalloc.txt"). See
+        `scriptExamples/common/nativediagnostics.py`.
+    'flight_recorder' : int
+        The number of trace points (events, updates, ...) kept in memory.
+        They are only written to a file next to the log file
+        ("script-systemtrayicon-<time>.trace.txt"), if an exception occurs.
+        Set to `0` to disable it (the trace points then cost almost
+        nothing). See `scriptExamples/common/flightrecorder.py`.
 
 Icon
 ====
@@ -130,23 +192,24 @@ Copyright (C) 2022  Stephan Helma
 
 """
 
-import base64
-import io
-import json
 import os
 import pathlib
 import signal
-import struct
 import sys
 import time
 
-from PIL import Image
-import pystray
+# The shared helper modules are in the folder `scriptExamples/common`
+sys.path.insert(
+    0, str(pathlib.Path(__file__).resolve().parents[2] / 'common'))
+
+# The other modules (especially `PIL` and `pystray`) are imported, where they
+# are needed. In the connectionless mode this script is started for every
+# event, so the time to start is the time until the notification is shown.
 
 
 __version_info__ = (0, 1, 0)
 __version__ = '.'.join([str(n) for n in __version_info__])
-__pyversion__ = '>=3.6'             # We use f-strings!
+__pyversion__ = '>=3.7'             # We use f-strings and asyncio!
 
 
 # The configuration
@@ -175,6 +238,14 @@ CONFIG = {
             'outline': (255, 255, 255, 191)     # white
         }
     },
+    'icon_cache': True,             # Store the generated icons on disk
+    'daemon_idle_timeout': None,    # Seconds until an idle daemon exits
+    'update_window': 0.1,           # Seconds to merge updates of the icon
+    'max_messages': 10000,          # New messages remembered per folder
+    'state': True,                  # Restore the new messages on start
+    'metrics': True,                # Serve the metrics on a UNIX socket
+    'diagnostics': True,            # Profile on SIGUSR1, memory on SIGUSR2
+    'flight_recorder': 1000,        # Trace points written on exceptions
 #    'logging': 'WARNING'           # Logging level, set to `None` to disable it
 #    'logging': 'INFO'
 #    'logging': 'DEBUG'
@@ -182,26 +253,45 @@ CONFIG = {
 }
 
 
+# The name of the daemon for the connectionless mode
+DAEMON = 'script-systemtrayicon'
+
+# The log file (the diagnostics are written next to it)
+LOGFILE = pathlib.Path(
+    '~', pathlib.Path(__file__).with_suffix('.log').name
+    ).expanduser()
+
+
 # The logging system
 if CONFIG['logging']:
     import logging
     logging.basicConfig(
         level=getattr(logging, CONFIG['logging']),
         format='%(levelname)8s %(funcName)s%(message)s',
-        filename=pathlib.Path(
-            '~', pathlib.Path(__file__).with_suffix('.log').name
-            ).expanduser())
+        filename=LOGFILE)
 else:
     # Make a `logging` object, which does nothing
     # https://stackoverflow.com/questions/13521981/implementing-an-optional-logger-in-code#answer-13525899
     class DummyObject(object):
+        # One function for all calls (and not a new one for each call)
+        @staticmethod
+        def _nothing(*args, **kwargs):
+            return None
         def __getattr__(self, name):
-            return lambda *x: None
+            return self._nothing
         def __bool__(self):
             return False
     logging = DummyObject()
 
 
+# The flight recorder: `trace()` keeps the last trace points in memory, they
+# are only written to a file, if an exception occurs
+import flightrecorder  # noqa: E402
+recorder = flightrecorder.FlightRecorder(
+    LOGFILE, CONFIG['flight_recorder'] or 0)
+trace = recorder.trace
+
+
 #
 # The icon
 #
@@ -254,6 +344,10 @@ class PostHorn:
     _background = (0, 0, 0, 0)
 
     def __init__(self):
+        import base64
+        import io
+        from PIL import Image
+
         self.image = Image.open(
             io.BytesIO(base64.b64decode(self._b64)),
             formats=['PNG'])
@@ -296,44 +390,476 @@ class PostHorn:
         if background is not None:
             color_pairs.append((self._background, background))
 
-        # Replace color pairs
-        for x in range(img.width):
-            for y in range(img.height):
-                for from_color, to_color in color_pairs:
-                    if img.getpixel((x, y)) == from_color:
-                        img.putpixel((x, y), to_color)
+        # Replace color pairs. The pairs are applied one after the other to
+        # the whole image, so a pixel changed by one pair is changed again, if
+        # it matches a later pair.
+        for from_color, to_color in color_pairs:
+            mask = self.mask(img, from_color)
+            if mask is not None:
+                img.paste(to_color, mask=mask)
 
         return img
 
+    @staticmethod
+    def mask(img, color):
+        """Get a mask of all pixels with the given color.
+
+        Parameters
+        ----------
+        img : Image
+            The image.
+        color : RGBA
+            The color to look for.
+
+        Returns
+        -------
+        Image|None
+            A bilevel ("1") image, which is set for all pixels of `img` with
+            the color `color`. `None`, if the image has a different number of
+            bands than the color has values.
+        """
+        from PIL import ImageChops
+
+        bands = img.split()
+        if len(bands) != len(color):
+            return None
+
+        mask = None
+        for band, value in zip(bands, color):
+            # Set for all pixels with this value in this band
+            band_mask = band.point(
+                [255 if v == value else 0 for v in range(256)], '1')
+            if mask is None:
+                mask = band_mask
+            else:
+                mask = ImageChops.logical_and(mask, band_mask)
+        return mask
+
+
+def render_icons(colors):
+    """Generate the icons for all states.
+
+    Parameters
+    ----------
+    colors : dict
+        The colors for each state, see `CONFIG['color']`.
+
+    Returns
+    -------
+    dict
+        The icons by state.
+    """
+    logging.debug('(%s)', colors)
+
+    icon = PostHorn()
+    return {state: icon(**color) for state, color in colors.items()}
+
+
+class IconCache:
+    """Store the generated icons in the user's cache directory.
+
+    The icons are stored as PNG files named after a key, which is a hash of
+    the icon data and of the colors. If any of them changes, the key changes
+    and the icons are generated again. Only the icons of the `size` most
+    recently used keys are kept.
+
+    """
+
+    # Change this, if the way the icons are generated changes
+    version = 1
+
+    def __init__(self, directory=None, size=4):
+        if directory is None:
+            directory = self.user_cache_directory()
+        self.directory = pathlib.Path(directory)
+        self.size = size
+
+    @staticmethod
+    def user_cache_directory():
+        """Return the cache directory of this script."""
+        if sys.platform == 'win32':
+            base = os.environ.get('LOCALAPPDATA', '~/AppData/Local')
+        elif sys.platform == 'darwin':
+            base = '~/Library/Caches'
+        else:
+            base = os.environ.get('XDG_CACHE_HOME') or '~/.cache'
+        return pathlib.Path(base).expanduser() / 'scriptable-notifications'
+
+    def key(self, colors):
+        """Return the key for the icons with these colors."""
+        import hashlib
+        import json
+        data = json.dumps(
+            [self.version, colors], sort_keys=True).encode('utf-8')
+        return hashlib.sha256(PostHorn._b64 + data).hexdigest()[:32]
+
+    def icons(self, colors):
+        """Get the icons from the cache or generate (and store) them.
+
+        Parameters
+        ----------
+        colors : dict
+            The colors for each state, see `CONFIG['color']`.
+
+        Returns
+        -------
+        dict
+            The icons by state.
+        """
+        logging.debug('(%s)', colors)
+
+        key = self.key(colors)
+        icons = self.load(key, colors)
+        if icons is None:
+            icons = render_icons(colors)
+            try:
+                self.save(key, icons)
+                self.prune()
+            except OSError as e:
+                logging.warning(': Cannot cache the icons: %s', e)
+        return icons
+
+    def path(self, key, state):
+        """Return the path of the icon for `state`."""
+        return self.directory / f'{key}-{state.replace(" ", "_")}.png'
+
+    def load(self, key, colors):
+        """Load the icons with `key`, `None` if any of them is missing."""
+        from PIL import Image
+
+        icons = {}
+        try:
+            for state in colors:
+                path = self.path(key, state)
+                img = Image.open(path, formats=['PNG'])
+                img.load()
+                icons[state] = img
+                # Mark it as recently used
+                os.utime(path)
+        except (OSError, SyntaxError) as e:
+            logging.info(': Icons not cached: %s', e)
+            return None
+        logging.info(': Icons loaded from the cache (%s)', key)
+        return icons
+
+    def save(self, key, icons):
+        """Save the icons under `key`."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for state, img in icons.items():
+            path = self.path(key, state)
+            # Write to a temporary file first, so that a concurrently
+            # starting script never reads a partial file
+            temp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+            img.save(temp, format='PNG')
+            os.replace(temp, path)
+        logging.info(': Icons saved in the cache (%s)', key)
+
+    def prune(self):
+        """Remove all but the `size` most recently used sets of icons."""
+        last_used = {}
+        for path in self.directory.glob('*-*.png'):
+            key = path.name.split('-', 1)[0]
+            last_used[key] = max(
+                last_used.get(key, 0), path.stat().st_mtime)
+        for key in sorted(last_used, key=last_used.get)[:-self.size]:
+            for path in self.directory.glob(f'{key}-*.png'):
+                logging.debug(': remove %s', path)
+                path.unlink()
+
+
+#
+# The new messages
+#
+
+class MessageIds:
+    """A compact, bounded set of message IDs.
+
+    The message IDs are stored as 64 bit hashes in arrays: a ring in the
+    order the messages were added, one sorted for the look up. If there are
+    more than `size` messages, the oldest are forgotten (their slots in the
+    ring are overwritten), but still counted.
+
+    Parameters
+    ----------
+    size : int
+        The maximum number of message IDs remembered. The default is
+        `CONFIG['max_messages']`.
+    """
+
+    def __init__(self, size=None):
+        import array
+        self.size = CONFIG['max_messages'] if size is None else size
+        self._ids = array.array('Q')
+        self._sorted = array.array('Q')
+        # The slot of the oldest message in `_ids`, once it is full
+        self._head = 0
+        # The number of forgotten message IDs
+        self.forgotten = 0
+
+    @staticmethod
+    def hash(message_id):
+        """Return the 64 bit hash of `message_id`.
+
+        Unlike `hash()`, this does not change between runs.
+        """
+        import hashlib
+        return int.from_bytes(
+            hashlib.blake2b(message_id.encode(), digest_size=8).digest(),
+            'little')
+
+    def __len__(self):
+        return len(self._ids) + self.forgotten
+
+    def __contains__(self, message_id):
+        import bisect
+        h = self.hash(message_id)
+        i = bisect.bisect_left(self._sorted, h)
+        return i < len(self._sorted) and self._sorted[i] == h
+
+    @property
+    def remembered(self):
+        """The number of message IDs remembered (not forgotten)."""
+        return len(self._ids)
+
+    def __repr__(self):
+        return (
+            f'<{self.__class__.__name__} {len(self._ids)} messages, '
+            f'{self.forgotten} forgotten>')
+
+    def add(self, message_id):
+        """Add `message_id`, if it is not in the set yet."""
+        import bisect
+        h = self.hash(message_id)
+        i = bisect.bisect_left(self._sorted, h)
+        if i < len(self._sorted) and self._sorted[i] == h:
+            return
+        if len(self._ids) < self.size:
+            self._sorted.insert(i, h)
+            self._ids.append(h)
+        elif self.size:
+            # Forget the oldest message and reuse its slot in the ring
+            oldest = self._ids[self._head]
+            self._ids[self._head] = h
+            self._head = (self._head + 1) % self.size
+            j = bisect.bisect_left(self._sorted, oldest)
+            # Move the hashes between the slots of the oldest and the new
+            # message (instead of deleting and inserting)
+            if j < i:
+                self._sorted[j:i - 1] = self._sorted[j + 1:i]
+                self._sorted[i - 1] = h
+            else:
+                self._sorted[i + 1:j + 1] = self._sorted[i:j]
+                self._sorted[i] = h
+            self.forgotten += 1
+        else:
+            self.forgotten += 1
+
+    def tobytes(self):
+        """Return the hashes (oldest first) as bytes."""
+        return (self._ids[self._head:] + self._ids[:self._head]).tobytes()
+
+    @classmethod
+    def frombytes(cls, data, forgotten=0, size=None):
+        """Return the `MessageIds` with the hashes from `tobytes()`."""
+        import array
+        ids = cls(size)
+        ids._ids.frombytes(data)
+        ids.forgotten = forgotten
+        if len(ids._ids) > ids.size:
+            # Keep the newest, if less messages are remembered now
+            ids.forgotten += len(ids._ids) - ids.size
+            del ids._ids[:len(ids._ids) - ids.size]
+        ids._sorted = array.array('Q', sorted(ids._ids))
+        return ids
+
+
+class StateStore:
+    """Store the new messages in the user's state directory.
+
+    The new messages of each folder are stored in a row of an SQLite
+    database, so that a restarted script can show them right away. Only the
+    rows of the folders, which have changed, are written.
+
+    """
+
+    # Change this, if the table changes
+    version = 1
+
+    def __init__(self, path=None):
+        import sqlite3
+        import threading
+        if path is None:
+            path = self.user_state_directory() / f'{DAEMON}.sqlite'
+        path = pathlib.Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+
+        # The menu call backs run in another thread than the events
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(
+            str(path), isolation_level=None, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = NORMAL')
+        version = self.db.execute('PRAGMA user_version').fetchone()[0]
+        if version != self.version:
+            self.db.execute('DROP TABLE IF EXISTS folders')
+            self.db.execute(f'PRAGMA user_version = {self.version}')
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS folders ('
+            ' id TEXT PRIMARY KEY,'
+            ' position INTEGER,'
+            ' label TEXT,'
+            ' ids BLOB,'
+            ' forgotten INTEGER)')
+
+    @staticmethod
+    def user_state_directory():
+        """Return the state directory of this script."""
+        if sys.platform == 'win32':
+            base = os.environ.get('LOCALAPPDATA', '~/AppData/Local')
+        elif sys.platform == 'darwin':
+            base = '~/Library/Application Support'
+        else:
+            base = os.environ.get('XDG_STATE_HOME') or '~/.local/state'
+        return pathlib.Path(base).expanduser() / 'scriptable-notifications'
+
+    def load(self):
+        """Return the stored folders.
+
+        Returns
+        -------
+        list
+            The tuples `(folder_id, label, message_ids)` in the order of the
+            folders.
+        """
+        with self._lock:
+            rows = self.db.execute(
+                'SELECT id, label, ids, forgotten FROM folders '
+                'ORDER BY position').fetchall()
+        return [
+            (folder_id, label, MessageIds.frombytes(ids, forgotten))
+            for folder_id, label, ids, forgotten in rows]
+
+    def save(self, folders, removed=()):
+        """Store the folders.
+
+        Parameters
+        ----------
+        folders : iterable
+            The tuples `(folder_id, position, label, message_ids)` of the
+            folders, which have changed.
+        removed : iterable
+            The IDs of the folders, which have been removed.
+        """
+        with self._lock:
+            self.db.execute('BEGIN')
+            try:
+                self.db.executemany(
+                    'DELETE FROM folders WHERE id = ?',
+                    [(folder_id,) for folder_id in removed])
+                self.db.executemany(
+                    'INSERT OR REPLACE INTO folders '
+                    '(id, position, label, ids, forgotten) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    [(folder_id, position, label, ids.tobytes(), ids.forgotten)
+                     for folder_id, position, label, ids in folders])
+            except BaseException:
+                self.db.execute('ROLLBACK')
+                raise
+            self.db.execute('COMMIT')
+
 
 #
 # Main class
 #
 
 class StatusIcon:
-    """Show an icon in the system tray."""
+    """Show an icon in the system tray.
+
+    Attributes
+    ----------
+    updates_received : int
+        The number of events received.
+    updates_applied : int
+        The number of updates of the icon (see `CONFIG['update_window']`).
+    unseen : int
+        The number of new, but unseen messages in all folders.
+    """
 
-    def __init__(self):
-        logging.debug('()')
+    def __init__(self, socket=None):
+        import nativehost
+        import pystray
+        logging.debug('(%s)', socket)
+
+        # Read the messages from this UNIX socket instead of stdin
+        self.socket = socket
 
         # Set up status icons
-        icon = PostHorn()
-        self.icons = {
-            'indifferent': icon(
-                fill=CONFIG['color']['indifferent']['fill'],
-                outline=CONFIG['color']['indifferent']['outline']),
-            'new mail': icon(
-                fill=CONFIG['color']['new mail']['fill'],
-                outline=CONFIG['color']['new mail']['outline']),
-            'some mail': icon(
-                fill=CONFIG['color']['some mail']['fill'],
-                outline=CONFIG['color']['some mail']['outline']),
-            'no mail': icon(
-                fill=CONFIG['color']['no mail']['fill'],
-                outline=CONFIG['color']['no mail']['outline'])}
+        if CONFIG['icon_cache']:
+            self.icons = IconCache().icons(CONFIG['color'])
+        else:
+            self.icons = render_icons(CONFIG['color'])
 
         # New, but seen mail messages
         self.new_messages = {}
+        self.unseen = 0
+
+        # The folders (`Folder.key`) in the order of `msg.folders`, their
+        # labels in the title and the lines of the title of the folders with
+        # new messages. Only the lines of the changed folders are regenerated.
+        self._account_names = None
+        self._folder_ids = []
+        self._folder_labels = {}
+        self._title_lines = {}
+        self._changed_folders = set()
+
+        # The folders not yet stored and the folders to remove from the store
+        self.state = None
+        self._unsaved_folders = set()
+        self._removed_folders = set()
+        if CONFIG['state']:
+            import sqlite3
+            try:
+                self.state = StateStore()
+                self.restore()
+            except (OSError, sqlite3.Error) as e:
+                logging.warning(': Cannot restore the state: %s', e)
+                self.state = None
+
+        # The last event not yet applied to the icon, whether a "new" event
+        # was merged into it and the timer to apply it
+        self.updates_received = 0
+        self.updates_applied = 0
+        self._pending = None
+        self._pending_new = False
+        self._pending_timer = None
+
+        # Messages from and to Thunderbird
+        # The payloads are passed as `nativepayload.Event` objects
+        self.host = nativehost.NativeHost(
+            on_error=self.on_error, metrics_socket=metrics_socket(),
+            model=True)
+        self.host.add_handler(self.on_event)
+
+        # The metrics of the icon, in addition to those of the host
+        metrics = self.host.metrics
+        self._update_seconds = metrics.summary(
+            'update_seconds', 'Time to update the icon')
+        metrics.counter(
+            'updates_received_total', 'Events received by the icon',
+            function=lambda: self.updates_received)
+        metrics.counter(
+            'updates_applied_total', 'Updates of the icon',
+            function=lambda: self.updates_applied)
+        metrics.gauge(
+            'unseen_messages', 'New, but unseen messages',
+            lambda: self.unseen)
+        metrics.gauge(
+            'remembered_messages', 'Message IDs remembered',
+            lambda: sum(ids.remembered for ids in self.new_messages.values()))
+        metrics.gauge(
+            'folders', 'Folders tracked',
+            lambda: len(self.new_messages))
 
         # Create system tray menu
         if pystray.Icon.HAS_MENU:
@@ -366,9 +892,19 @@ class StatusIcon:
             icon=self.icons['indifferent'],
             title='ScriptableNotification started',
             menu=menu)
+        if self._folder_ids:
+            # Show the restored new messages
+            self._update_title(None)
+            self.icon.icon = self.icons[
+                'new mail' if self.unseen else 'no mail']
 
         # Attach signals
         signal.signal(signal.SIGTERM, self.on_sigterm)
+        self.diagnostics = None
+        if CONFIG['diagnostics']:
+            import nativediagnostics
+            self.diagnostics = nativediagnostics.Diagnostics(LOGFILE)
+            self.diagnostics.install(self.on_diagnostics)
 
     #
     # Main loop
@@ -386,41 +922,65 @@ class StatusIcon:
         logging.debug('()')
         logging.info(': Run input_loop')
 
-        icon.visible = True
+        import asyncio
 
-        message = Message()
-        while True:
-            try:
-                # Get message sent to us
-                msg = message.get()
-                if not msg:
-                    time.sleep(1)
-                    continue
-
-                # Parse the message
-                payload = json.loads(msg)
-
-                # (Pretty) print to logfile
-                logging.debug(f': ====== {time.asctime()} ======')
+        icon.visible = (
+            not self._folder_ids or bool(self.unseen)
+            or CONFIG['show_read_icon'])
 
-                self.update(payload)
-
-                # Send back required message
-                message.send({})
+        if self.socket is None:
+            # Sleep until a message arrives, return when stdin is closed
+            asyncio.run(self.host.run())
+            logging.info(': stdin closed')
+        else:
+            # Serve the shim, return when idle for too long
+            asyncio.run(self.host.serve(
+                self.socket, CONFIG['daemon_idle_timeout']))
+            logging.info(': daemon idle')
+        # The timer of a pending update has gone with the event loop
+        self.apply()
+        self.quit()
 
-            except Exception as e:
-                # If anything goes wrong, write the traceback to the logfile
-                logging.exception(e)
-                # ... and to the standard output
-                print(
-                    f"'{__file__}' raised the Exception: {e}",
-                    file=sys.stdout, flush=True)
+    async def on_event(self, payload):
+        """Handler for all events sent by Thunderbird."""
+        if recorder:
+            trace('event', payload.event, self.host.queue_depth)
+        # (Pretty) print to logfile
+        if logging:
+            logging.debug(': ====== %s ======', time.asctime())
+            logging.debug('(…): payload = %s', payload)
+
+        self.update(payload)
+
+    def on_error(self, e):
+        """Handler for the exceptions raised while handling an event."""
+        trace('error', type(e).__name__)
+        # If anything goes wrong, write the traceback to the logfile
+        logging.exception(e)
+        # ... and the trace points leading to it
+        try:
+            path = recorder.dump(e)
+        except OSError as dump_error:
+            logging.warning(': Cannot dump the trace points: %s', dump_error)
+        else:
+            if path is not None:
+                logging.info(': Trace points written to %s', path)
+        # ... and to the standard output
+        print(
+            f"'{__file__}' raised the Exception: {e}",
+            file=sys.stdout, flush=True)
 
     def quit(self):
         """Quit running."""
         logging.debug('()')
-        logging.info(': Quit StatusIcon')
-
+        trace('quit', self.updates_received, self.updates_applied)
+        logging.info(
+            ': Quit StatusIcon (%s updates received, %s applied)',
+            self.updates_received, self.updates_applied)
+
+        self.host.stop()
+        if self.diagnostics is not None:
+            self.diagnostics.close()
         self.icon.remove_notification()
         self.icon.stop()
 
@@ -473,13 +1033,37 @@ class StatusIcon:
         Quit running.
         """
         logging.debug('(%s, %s)', signum, frame)
+        trace('sigterm')
 
         self.quit()
 
+    def on_diagnostics(self, function):
+        """Call-back for the SIGUSR1 and SIGUSR2 signals.
+
+        Run the diagnostic `function` in the thread of the event loop, so
+        that the profiler profiles the handling of the events.
+        """
+        if not self.host.call_soon(self.diagnose, function):
+            self.diagnose(function)
+
     #
     # Methods
     #
 
+    def diagnose(self, function):
+        """Run the diagnostic `function` (see `nativediagnostics`)."""
+        logging.debug('(%s)', function.__name__)
+        trace('diagnose', function.__name__)
+        try:
+            path = function()
+        except Exception as e:
+            self.on_error(e)
+            return
+        if path is None:
+            logging.info(': %s started', function.__name__)
+        else:
+            logging.info(': %s written to %s', function.__name__, path)
+
     def thunderbird(self, thunderbird):
         """Start Thunderbird."""
         import subprocess
@@ -492,110 +1076,250 @@ class StatusIcon:
         """Reset the counter."""
         logging.debug('()')
         logging.info(': Reset counter')
-
-        dummy_msg = {'event': 'start'}
+        trace('reset', self.unseen)
 
         for folder in self.new_messages:
-            self.new_messages[folder] = set()
+            self.new_messages[folder] = MessageIds()
+        self.unseen = 0
+        self._title_lines.clear()
+        self._changed_folders.clear()
+        self._unsaved_folders.update(self.new_messages)
+        self.save()
         self.icon.title = 'No unseen messages'
-        self._update_icon(dummy_msg)
-        self._update_visibility(dummy_msg)
-        self._update_notification(dummy_msg)
+        self._update_icon('start')
+        self._update_visibility('start')
+        self._update_notification('start')
 
     def update(self, msg):
-        """Update the icon in the system tray."""
+        """Update the icon in the system tray.
+
+        The new messages are updated right away. The icon is updated, when
+        no more events arrive within `CONFIG['update_window']` seconds. The
+        events within the window are merged: the last event is applied, but
+        as a "new" event, if any of them was a "new" event and there are
+        still unseen messages (so that its notification is not lost).
+        """
         logging.debug('(…)')
-        logging.info(': Update (event = %s)', msg['event'])
+        logging.info(': Update (event = %s)', msg.event)
+        self.updates_received += 1
+        trace('update', msg.event, self.updates_received)
 
-        if msg['event'] == 'quit':
+        if msg.event == 'quit':
             self.quit()
 
         self._update_newmessages(msg)
+
+        self._pending = msg
+        if msg.event == 'new':
+            self._pending_new = True
+        if not CONFIG['update_window']:
+            self.apply()
+        elif self._pending_timer is None:
+            import asyncio
+            self._pending_timer = asyncio.get_running_loop().call_later(
+                CONFIG['update_window'], self.apply)
+
+    def apply(self):
+        """Apply the events merged since the last update to the icon."""
+        msg, self._pending = self._pending, None
+        new, self._pending_new = self._pending_new, False
+        self._pending_timer = None
+        if msg is None:
+            return
+        event = msg.event
+        if new and self.unseen:
+            # The new messages of a merged "new" event are still unseen
+            event = 'new'
+        logging.debug(
+            '(): event = %s (merged %s), %s updates received, %s applied',
+            msg.event, event, self.updates_received, self.updates_applied)
+        self.updates_applied += 1
+        trace('apply', event, self.updates_applied, self.unseen)
+
+        start = time.perf_counter()
         self._update_title(msg)
-        self._update_icon(msg)
-        self._update_visibility(msg)
-        self._update_notification(msg)
+        self._update_icon(event)
+        self._update_visibility(event)
+        self._update_notification(event)
+        self._update_seconds.observe(time.perf_counter() - start)
+        self.save()
+
+    def restore(self):
+        """Restore the new messages from the state store."""
+        for folder_id, label, messages in self.state.load():
+            self.new_messages[folder_id] = messages
+            self.unseen += len(messages)
+            self._folder_ids.append(folder_id)
+            self._folder_labels[folder_id] = label
+        self._changed_folders.update(self._folder_ids)
+        trace('restore', self.unseen, len(self._folder_ids))
+        logging.info(
+            ': Restored %s new messages in %s folders',
+            self.unseen, len(self._folder_ids))
+
+    def save(self):
+        """Store the folders, which have changed, in the state store."""
+        if self.state is None or not (
+                self._unsaved_folders or self._removed_folders):
+            return
+        import sqlite3
+        positions = {
+            folder_id: position
+            for position, folder_id in enumerate(self._folder_ids)}
+        folders = [
+            (folder_id, positions.get(folder_id),
+             self._folder_labels.get(folder_id, folder_id),
+             self.new_messages[folder_id])
+            for folder_id in self._unsaved_folders
+            if folder_id in self.new_messages]
+        trace('save', len(folders), len(self._removed_folders))
+        try:
+            self.state.save(folders, self._removed_folders)
+        except (OSError, sqlite3.Error) as e:
+            trace('save failed', str(e))
+            logging.warning(': Cannot store the state: %s', e)
+        self._unsaved_folders.clear()
+        self._removed_folders.clear()
 
     def _update_newmessages(self, msg):
-        """Update the `new_messages` attribute."""
-        logging.debug('(…): folders = %s', msg.get('folders', None))
-
-        if 'folders' in msg:
-            msg_folders = {
-                f'{folder["accountId"]}{folder["path"]}'
-                for folder in msg['folders']}
-            new_folders = set(self.new_messages)
-            for folder_id in msg_folders.difference(new_folders):
-                # Folders in `msg['folders']`, but not in `self.new_messages`,
-                # - add them
-                self.new_messages[folder_id] = set()
-            for folder_id in new_folders.difference(msg_folders):
-                # Folders in `self.new_messages`, but not in `msg['folders']`
-                # - remove them
-                del self.new_messages[folder_id]
-
-
-        if msg['event'] == 'start':
-            pass
-        else:
-            folder_id = f'{msg["message"]["folder"]["accountId"]}{msg["message"]["folder"]["path"]}'
+        """Update the `new_messages` and `unseen` attributes.
 
-            if msg['event'] == 'new':
-                self.new_messages[folder_id].add(msg['message']['messageId'])
-            elif msg['event'] == 'read':
+        The add-on sends all new messages arriving together with one event
+        (`msg.messages`).
+        """
+        logging.debug('(…): folders = %s', msg.folders)
+
+        if msg.event != 'quit':
+            # The "quit" event has no folders
+            self._update_folders(msg)
+
+        if msg.event == 'start':
+            # Reconcile the (restored) new messages: Folders without unread
+            # messages have no new messages
+            for folder in msg.folders:
+                if folder.unread_message_count == 0:
+                    self._clear(folder.key)
+
+        for message in msg.messages:
+            folder_id = message.folder.key
+            messages = self.new_messages[folder_id]
+
+            if msg.event == 'new':
+                if message.message_id not in messages:
+                    messages.add(message.message_id)
+                    self.unseen += 1
+                    self._changed_folders.add(folder_id)
+                    self._unsaved_folders.add(folder_id)
+                    trace('new', folder_id, len(messages))
+            elif msg.event == 'read':
                 # One message read => remove all unread messages
                 # We could also only remove this message:
-                #     self.new_messages[folder_id].remove(msg['message']['messageId'])
-                self.new_messages[folder_id] = set()
+                #     self.new_messages[folder_id].remove(message.message_id)
+                if messages:
+                    self._clear(folder_id)
 
         logging.debug(': new_messages = %s', self.new_messages)
 
-    def _update_notification(self, msg):
+    def _clear(self, folder_id):
+        """Remove all new messages of a folder."""
+        if self.new_messages[folder_id]:
+            trace('clear', folder_id, len(self.new_messages[folder_id]))
+            self.unseen -= len(self.new_messages[folder_id])
+            self.new_messages[folder_id] = MessageIds()
+            self._changed_folders.add(folder_id)
+            self._unsaved_folders.add(folder_id)
+
+    def _update_folders(self, msg):
+        """Update the folders, if they have changed.
+
+        Most events only change the counts of the folders. The number of
+        folders and the names of the accounts are compared first, then the
+        keys of the folders (built once, while the payload was decoded). The
+        list of the keys and the labels are only built, if they differ.
+        """
+        folders = msg.folders
+        accounts = msg.accounts
+        account_names = {
+            account_id: account.name
+            for account_id, account in accounts.items()}
+        if (len(folders) == len(self._folder_ids)
+                and account_names == self._account_names
+                and all(folder.key == folder_id for folder, folder_id
+                        in zip(folders, self._folder_ids))):
+            return
+        folder_ids = [folder.key for folder in folders]
+        logging.debug(': folders changed')
+        trace('folders', len(folder_ids))
+
+        msg_folders = set(folder_ids)
+        new_folders = set(self.new_messages)
+        for folder_id in msg_folders.difference(new_folders):
+            # Folders in `msg.folders`, but not in `self.new_messages`,
+            # - add them
+            self.new_messages[folder_id] = MessageIds()
+        for folder_id in new_folders.difference(msg_folders):
+            # Folders in `self.new_messages`, but not in `msg.folders`
+            # - remove them
+            self.unseen -= len(self.new_messages.pop(folder_id))
+            self._title_lines.pop(folder_id, None)
+            self._removed_folders.add(folder_id)
+
+        self._folder_labels = {}
+        for folder in folders:
+            account_name = account_names.get(
+                folder.account_id, folder.account_id)
+            self._folder_labels[folder.key] = f'{account_name}{folder.path}'
+        self._account_names = account_names
+        self._folder_ids = folder_ids
+        # Regenerate the whole title (and store all positions and labels)
+        self._changed_folders.update(folder_ids)
+        self._unsaved_folders.update(folder_ids)
+
+    def _update_notification(self, event):
         """Update notifications."""
-        logging.debug(
-            '(…): event = %s, title = %s',
-            msg.get('event', None), self.icon.title)
+        logging.debug('(%s): title = %s', event, self.icon.title)
 
         if CONFIG['notify']:
-            if msg['event'] == 'start':
+            if event == 'start':
                 self.icon.remove_notification()
-            elif msg['event'] == 'new':
+            elif event == 'new':
                 self.icon.notify(
                     f'New messages available:\n{self.icon.title}',
                     'Thunderbird')
-            elif msg['event'] == 'read':
+            elif event == 'read':
                 self.icon.remove_notification()
 
-    def _update_visibility(self, msg):
+    def _update_visibility(self, event):
         """Update the visibility of the system tray icon."""
-        logging.debug('(…): event = %s', msg.get('event', None))
+        logging.debug('(%s)', event)
 
-        if msg['event'] == 'start':
-            if CONFIG['show_read_icon']:
-                self.icon.visible = True
-            else:
-                self.icon.visible = False
-        elif msg['event'] == 'new':
+        if event == 'start':
+            # The new messages restored and reconciled (if any) stay visible
+            self.icon.visible = bool(self.unseen) or CONFIG['show_read_icon']
+        elif event == 'new':
             self.icon.visible = True
-        elif msg['event'] == 'read' and not any(self.new_messages.values()):
+        elif event == 'read' and not self.unseen:
             if CONFIG['show_read_icon']:
                 self.icon.visible = True
             else:
                 self.icon.visible = False
         logging.debug(': visible = %s', self.icon.visible)
 
-    def _update_icon(self, msg):
+    def _update_icon(self, event):
         """Update the image used for the system tray icon."""
-        logging.debug('(…): event = %s', msg.get('event', None))
+        logging.debug('(%s)', event)
 
-        if msg['event'] == 'start':
-            self.icon.icon = self.icons['no mail']
-            logging.debug(': icon = no mail')
+        if event == 'start':
+            # The new messages restored and reconciled (if any) are shown
+            if self.unseen:
+                self.icon.icon = self.icons['new mail']
+                logging.debug(': icon = new mail')
+            else:
+                self.icon.icon = self.icons['no mail']
+                logging.debug(': icon = no mail')
 
         else:
-            folder_id = f'{msg["message"]["folder"]["accountId"]}{msg["message"]["folder"]["path"]}'
-
-            if msg['event'] == 'new':
+            if event == 'new':
                 # Add badge to the icon
                 # badge = ['❚' if v else '–' for v in self.new_messages.values()]
                 # logging.debug(': badge = %s', badge)
@@ -604,8 +1328,8 @@ class StatusIcon:
                 self.icon.icon = self.icons['new mail']
                 logging.debug(': icon = new mail')
 
-            elif msg['event'] == 'read':
-                if any(self.new_messages.values()):
+            elif event == 'read':
+                if self.unseen:
                     self.icon.icon = self.icons['some mail']
                     self.icon.visible = True
                     logging.debug(': icon = some mail')
@@ -616,124 +1340,79 @@ class StatusIcon:
                     logging.debug(': icon = no mail')
 
     def _update_title(self, msg):
-        """Update the title of the system tray icon."""
-        logging.debug('(…): folders = %s', msg.get('folders', None))
+        """Update the title of the system tray icon.
 
-        title = []
-        for folder in msg['folders']:
-            logging.debug(': account = %s', folder['accountId'])
-            try:
-                new_messages = len(self.new_messages[f'{folder["accountId"]}{folder["path"]}'])
-            except KeyError:
-                new_messages = 0
-            logging.debug(': new messages = %s', new_messages)
-            if new_messages:
-                account = msg['accounts'][folder['accountId']]
-                account_name = account['name']
-                folder_path = folder['path']
-                title.append(f'{new_messages:4d} {account_name}{folder_path}')
-            logging.debug(': title = %s', title)
-        if title:
-            self.icon.title = '\n'.join(title)
+        Only the lines of the folders, whose counts have changed, are
+        regenerated.
+        """
+        logging.debug('(…): changed folders = %s', self._changed_folders)
+
+        if not self._changed_folders:
+            return
+        for folder_id in self._changed_folders:
+            new_messages = len(self.new_messages.get(folder_id, ()))
+            logging.debug(': %s new messages = %s', folder_id, new_messages)
+            if new_messages and folder_id in self._folder_labels:
+                self._title_lines[folder_id] = (
+                    f'{new_messages:4d} {self._folder_labels[folder_id]}')
+            else:
+                self._title_lines.pop(folder_id, None)
+        self._changed_folders.clear()
+
+        if self._title_lines:
+            self.icon.title = '\n'.join(
+                self._title_lines[folder_id]
+                for folder_id in self._folder_ids
+                if folder_id in self._title_lines)
         else:
             self.icon.title = 'No unseen messages'
         logging.debug(': title (displayed) = %s', self.icon.title)
 
 
 #
-# Helper class
+# Main function
 #
 
-class Message:
-    """Get and send messages from/to the standard input and output."""
-
-    def decode(self, s):
-        """Decode the json string received over standard input.
-
-        Parameters
-        ----------
-        msg : str
-            The message to decode.
-
-        Returns
-        -------
-        dict
-            The decoded json string.
-
-        """
-        logging.debug('(%s)', s)
-        return json.loads(s)
-
-    def encode(self, msg):
-        """Encode the message to send over standard output.
-
-        If we ever have to deal with more than an empty string to send back,
-        we have to convert the object to a JSON string first:
-            >>> import json  # <- Put this into the header
-            >>> encoded_content = json.dumps(msg).encode('utf-8')
-
-        Parameters
-        ----------
-        msg : str
-            The message to be sent.
-
-        Returns
-        -------
-        str, int
-            The encoded message and the length.
-        """
-        logging.debug('(%s)', msg)
-        encoded_content = f'"{msg}"'.encode('utf-8')
-        encoded_length = struct.pack('@I', len(encoded_content))
-
-        logging.debug(
-            ': Encoded message: (%s, %s)',
-            encoded_content, encoded_length)
-        return encoded_content, encoded_length
-
-    def get(self):
-        """Get and parse message from the standard input.
-
-        Returns
-        -------
-        bool
-            If standard input is `"true"`, return `True`, otherwise `False`.
-
-        """
-        logging.debug('()')
-
-        raw_length = sys.stdin.buffer.read(4)
-        if len(raw_length) == 0:
-            return None
-        message_length = struct.unpack('@I', raw_length)[0]
-        message = sys.stdin.buffer.read(message_length).decode('utf-8')
-        return message
-
-    def send(self, msg):
-        """Prepare and send a message to the standard output.
-
-        Parameters
-        ----------
-        msg : str
-            The string to be sent.
-
-        """
-        logging.debug('(%s)', msg)
-
-        encoded_content, encoded_length = self.encode(msg)
-        sys.stdout.buffer.write(encoded_length)
-        sys.stdout.buffer.write(encoded_content)
-        sys.stdout.buffer.flush()
+def metrics_socket():
+    """Return the UNIX socket serving the metrics (or `None`)."""
+    import socket
+    if not CONFIG['metrics'] or not hasattr(socket, 'AF_UNIX'):
+        return None
+    import nativedaemon
+    return nativedaemon.metrics_path(DAEMON)
 
 
-#
-# Main function
-#
-
 def main():
     if logging:
         logging.info(' ====== %s ======', time.asctime())
         logging.debug('(): argv = %s (%s)', sys.argv, len(sys.argv))
+    recorder.install()
+    trace('main', *sys.argv[1:])
+
+    if sys.argv[1:] == ['--metrics']:
+        # Print the metrics of the running script
+        import nativemetrics
+        path = metrics_socket()
+        if path is None:
+            print('The metrics are disabled', file=sys.stderr)
+            exit(1)
+        try:
+            print(nativemetrics.dump(path), end='')
+        except OSError as e:
+            print(f'No metrics at {path}: {e}', file=sys.stderr)
+            exit(1)
+        return
+
+    if sys.argv[1:] == ['--daemon']:
+        # Started by the shim `script-systemtrayicon-shim.py`
+        import nativedaemon
+        lock = nativedaemon.lock(DAEMON)
+        if lock is None:
+            logging.info(': Daemon already running')
+            return
+        icon = StatusIcon(socket=nativedaemon.socket_path(DAEMON))
+        icon.run()
+        return
 
     if len(sys.argv) != 3:
         # Parameters
@@ -764,4 +1443,8 @@ if __name__ == '__main__':
         main()
     except Exception as e:
         logging.exception("Cannot start '%s'", __file__)
+        try:
+            recorder.dump(e)
+        except OSError:
+            pass
         print(f"Cannot start '{__file__}'", file=sys.stdout, flush=True)
@@ -14,11 +14,14 @@
 # points to your copy of Python.
 #
 import sys
-import json
-import struct
+import pathlib
 import subprocess
 import shlex
 
+# The shared "nativemessaging" module is in the folder "scriptExamples/common"
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2] / "common"))
+import nativemessaging
+
 #==========================================
 # Main function
 #==========================================
@@ -43,33 +46,13 @@ def showAlert(msg):
         osascript -e 'display notification \"{}\" with title \"Scriptable Notifications\"'
     '''.format(msg)))
 
-# Read a message from stdin and decode it.
-def getMessage():
-    rawLength = sys.stdin.buffer.read(4)
-    if len(rawLength) == 0:
-        sys.exit(0)
-    messageLength = struct.unpack('@I', rawLength)[0]
-    message = sys.stdin.buffer.read(messageLength).decode('utf-8')
-    return json.loads(message)
-
-# Encode a message for transmission,
-# given its content.
-def encodeMessage(messageContent):
-    encodedContent = json.dumps(messageContent).encode('utf-8')
-    encodedLength = struct.pack('@I', len(encodedContent))
-    return {'length': encodedLength, 'content': encodedContent}
-
-# Send an encoded message to stdout
-def sendMessage(encodedMessage):
-    sys.stdout.buffer.write(encodedMessage['length'])
-    sys.stdout.buffer.write(encodedMessage['content'])
-    sys.stdout.buffer.flush()
-
 
 #==========================================
 # Get the "true" or "false" parameter from the add-on, call the
 # "main()" function and close the connection properly.
 #==========================================
-hasUnreadMessages = getMessage()
+hasUnreadMessages = nativemessaging.get_message()
+if hasUnreadMessages is None:
+    sys.exit(0)
 main(hasUnreadMessages)
-sendMessage(encodeMessage("{}"))
+nativemessaging.send_message("{}")
@@ -6,10 +6,56 @@ window.scrNoti = window.scrNoti || {};
 const seenMessages = {};
 let nativeConnection = null;
 
+//==========================================
+// Options (cached until they change)
+//==========================================
+const optionsDefaults = {
+  scriptType: "simple",
+  connectionType: "connectionless",
+  foldersToCheck: [],
+  deltaPayload: false,
+  onlyStateChanges: false,
+  tracePayload: false,
+};
+let optionsCache = null;
+
+window.scrNoti.getOptions = async () => {
+  if (optionsCache == null) {
+    optionsCache = messenger.storage.local.get(optionsDefaults).then(
+      (options) => {
+        // For 'isFolderToCheck': Set of accountId + path
+        options.foldersToCheckKeys = new Set(
+          options.foldersToCheck.map((folder) => folder.accountId + folder.path)
+        );
+        return options;
+      }
+    );
+    // Do not cache a failure
+    optionsCache.catch(() => {
+      optionsCache = null;
+    });
+  }
+  return optionsCache;
+};
+
+window.scrNoti.optionsOnChangedListener = (changes, areaName) => {
+  if (areaName == "local"
+      && Object.keys(changes).some((key) => key in optionsDefaults)) {
+    optionsCache = null;
+  }
+  if (areaName == "local" && "foldersToCheck" in changes) {
+    unreadCounts = null;
+  }
+};
+messenger.storage.onChanged.removeListener(
+  window.scrNoti.optionsOnChangedListener
+);
+messenger.storage.onChanged.addListener(
+  window.scrNoti.optionsOnChangedListener
+);
+
 window.scrNoti.getScriptType = async () => {
-  const { scriptType } = await messenger.storage.local.get({
-    scriptType: "simple",
-  });
+  const { scriptType } = await window.scrNoti.getOptions();
   return scriptType;
 };
 
@@ -25,7 +71,15 @@ window.scrNoti.newEmailListener = async (folder, messages) => {
   // Find new messages, which have not been seen yet
   if (messages && messages.messages && messages.messages.length > 0) {
 
+    window.scrNoti.addUnreadCount(
+      folder,
+      messages.messages.filter(
+        (message) => message && !message.junk && !message.read).length
+    );
+
     const scriptType = await window.scrNoti.getScriptType();
+    // All new messages are sent with one event
+    const newMessages = [];
     for (const message of messages.messages) {
       if (message && !message.junk) {
         if (scriptType == "simple") {
@@ -33,11 +87,14 @@ window.scrNoti.newEmailListener = async (folder, messages) => {
           return;
         }
         if (!seenMessages[folder.accountId + folder.path].has(message.id)) {
-          await window.scrNoti.notifyNativeScript(message, "new");
+          newMessages.push(message);
           seenMessages[folder.accountId + folder.path].add(message.id);
         }
       }
     }
+    if (newMessages.length > 0) {
+      await window.scrNoti.notifyNativeScript(newMessages, "new");
+    }
   }
 };
 browser.messages.onNewMailReceived.removeListener(
@@ -60,6 +117,10 @@ window.scrNoti.messageOnUpdatedListener = async (
     return;
   }
 
+  if ("read" in changedProperties) {
+    window.scrNoti.addUnreadCount(message.folder, changedProperties.read ? -1 : 1);
+  }
+
   if (changedProperties.read) {
     const scriptType = await window.scrNoti.getScriptType();
     if (scriptType == "extended") {
@@ -77,7 +138,13 @@ browser.messages.onUpdated.addListener(window.scrNoti.messageOnUpdatedListener);
 // On receiving (update) message...
 //==========================================
 window.scrNoti.onNotifyListener = async (message) => {
+  if ("getTraceHistograms" in message && message.getTraceHistograms) {
+    return window.scrNoti.getTraceHistograms();
+  }
   if ("optionsChanged" in message && message.optionsChanged) {
+    // In case the change has not been reported yet
+    optionsCache = null;
+    lastSimplePayload = null;
 
     // Nothing to do for the "simple" mode.
     const scriptType = await window.scrNoti.getScriptType();
@@ -100,18 +167,48 @@ browser.runtime.onMessage.addListener(window.scrNoti.onNotifyListener);
 
 //==========================================
 // Any unread messages?
+//
+// The number of unread messages per folder is
+// seeded from the folder info and then updated
+// from the events. As a fallback, it is checked
+// against the folder info periodically.
 //==========================================
-window.scrNoti.hasUnreadMessages = async () => {
-  const foldersToCheckForUnread =
-    await window.scrNoti.getFoldersToCheckForUnread();
+// Map: accountId + path => number of unread messages
+let unreadCounts = null;
+const unreadCountsCheckInterval = 60 * 1000;
+const unreadCountsConcurrency = 4;
 
-  for (const folder of foldersToCheckForUnread) {
-    const result = await browser.messages.query({
-      unread: true,
-      folderId: folder.id,
-    });
+window.scrNoti.seedUnreadCounts = async () => {
+  const foldersToCheck = await window.scrNoti.getFoldersToCheckForUnread();
+  const counts = new Map();
+  await window.scrNoti.forEachConcurrently(
+    foldersToCheck,
+    unreadCountsConcurrency,
+    async (folder) => {
+      const folderInfo = await messenger.folders.getFolderInfo(folder.id);
+      counts.set(folder.accountId + folder.path, folderInfo.unreadMessageCount);
+    }
+  );
+  unreadCounts = counts;
+};
+
+window.scrNoti.addUnreadCount = (folder, delta) => {
+  if (unreadCounts == null) {
+    return;
+  }
+  const key = folder.accountId + folder.path;
+  if (unreadCounts.has(key)) {
+    unreadCounts.set(key, Math.max(0, unreadCounts.get(key) + delta));
+  }
+};
 
-    if (result && result.messages && result.messages.length > 0) {
+window.scrNoti.hasUnreadMessages = async () => {
+  if (unreadCounts == null) {
+    await window.scrNoti.seedUnreadCounts();
+  }
+
+  for (const count of unreadCounts.values()) {
+    if (count > 0) {
       return true;
     }
   }
@@ -119,10 +216,28 @@ window.scrNoti.hasUnreadMessages = async () => {
   return false;
 };
 
+window.scrNoti.checkUnreadCounts = async () => {
+  if (unreadCounts == null
+      || (await window.scrNoti.getScriptType()) != "simple") {
+    return;
+  }
+  const hadUnreadMessages = await window.scrNoti.hasUnreadMessages();
+  await window.scrNoti.seedUnreadCounts();
+  if ((await window.scrNoti.hasUnreadMessages()) != hadUnreadMessages) {
+    // Missed an event (e.g. a deleted or moved message)
+    await window.scrNoti.notifyNativeScript(null, "read");
+  }
+};
+setInterval(window.scrNoti.checkUnreadCounts, unreadCountsCheckInterval);
+
 //==========================================
 // Notify the native script
 //==========================================
+// The last payload sent in the "simple" mode
+let lastSimplePayload = null;
+
 window.scrNoti.notifyNativeScript = async (message, event) => {
+  const eventTime = performance.now();
   let payload = null;
   const scriptType = await window.scrNoti.getScriptType();
 
@@ -137,84 +252,55 @@ window.scrNoti.notifyNativeScript = async (message, event) => {
           payload = await window.scrNoti.hasUnreadMessages();
           break;
         case "start":
+          // Seed the number of unread messages again
+          unreadCounts = null;
           //==========================================
           // For some reason, the folders may not be ready when
           // Thunderbird starts (ex: "Error: Folder not found: /Inbox").
           // So we retry for a couple of times before giving up.
           //==========================================
           payload = await window.scrNoti.tryNbrTimes(window.scrNoti.hasUnreadMessages, 10);
+          // Always send the state on start
+          lastSimplePayload = null;
           break;
       };
+      const { onlyStateChanges } = await window.scrNoti.getOptions();
+      if (onlyStateChanges && payload === lastSimplePayload) {
+        return;
+      };
       break;
     case "extended":
       // List of all accounts
-      const accounts = await messenger.accounts.list(false);
-      const accountsList = {};
-      for (const account of accounts) {
-        const identitiesList = [];
-        for (const identity of account.identities) {
-          const mailIdentity = {
-            email: identity.email,
-            label: identity.label,
-            name: identity.name,
-            organization: identity.organization,
-          };
-          identitiesList.push(mailIdentity);
-        };
+      const accountsList = await window.scrNoti.getAccountsList();
 
-        const mailAccount = {
-          identities: identitiesList,
-          name: account.name,
-          type: account.type,
-        };
-        accountsList[account.id] = mailAccount;
-      };
-
-      // List of all folders, which should be included
+      // List of all folders, which should be included (the folder info is
+      // fetched concurrently)
       const foldersToInclude =
         await window.scrNoti.getFoldersToCheckForUnread();
-      const foldersList = [];
-      for (const folder of foldersToInclude) {
-        const folderInfo = await messenger.folders.getFolderInfo(folder.id);
-        const folderData = {
-          accountId: folder.accountId,
-          favorite: folderInfo.favorite,
-          name: folder.name,
-          path: folder.path,
-          totalMessageCount: folderInfo.totalMessageCount,
-          type: folder.type,
-          unreadMessageCount: folderInfo.unreadMessageCount,
-          seenMessageCount: seenMessages[folder.accountId + folder.path].size,
-        };
-        foldersList.push(folderData);
-      };
-
-      // Message data
-      if (event == "start") {
-        messageDetails = null;
-      } else {
-        const folder = message.folder;
-        messageDetails = {
-          author: message.author,
-          bccList: message.bbcList,
-          ccList: message.ccList,
-          date: message.date,
-          flagged: message.flagged,
-          messageId: message.headerMessageId,
-          headersOnly: message.headersOnly,
-          junk: message.junk,
-          junkScore: message.junkScore,
-          read: message.read,
-          size: message.size,
-          subject: message.subject,
-          tags: message.tags,
-          folder: {
+      const foldersList = await Promise.all(
+        foldersToInclude.map(async (folder) => {
+          const folderInfo = await messenger.folders.getFolderInfo(folder.id);
+          return {
             accountId: folder.accountId,
+            favorite: folderInfo.favorite,
             name: folder.name,
             path: folder.path,
+            totalMessageCount: folderInfo.totalMessageCount,
             type: folder.type,
-          },
-        };
+            unreadMessageCount: folderInfo.unreadMessageCount,
+            seenMessageCount: seenMessages[folder.accountId + folder.path].size,
+          };
+        })
+      );
+
+      // Message data (a list of messages for the "new" event)
+      let messagesDetails;
+      if (event == "start") {
+        messagesDetails = [];
+      } else if (Array.isArray(message)) {
+        messagesDetails = message.map(window.scrNoti.getMessageDetails);
+      } else {
+        messagesDetails = [window.scrNoti.getMessageDetails(message)];
       };
 
       // Assemble entire payload
@@ -222,40 +308,346 @@ window.scrNoti.notifyNativeScript = async (message, event) => {
         accounts: accountsList,
         folders: foldersList,
         event: event,
-        message: messageDetails,
+        // The last message (for scripts, which handle only one message)
+        message: messagesDetails.length > 0
+          ? messagesDetails[messagesDetails.length - 1] : null,
+        messages: messagesDetails,
       };
       break;
   };
 
-  const { connectionType } = await messenger.storage.local.get({
-    connectionType: "connectionless",
-  });
+  const { connectionType, deltaPayload, tracePayload } =
+    await window.scrNoti.getOptions();
 
   switch (connectionType) {
     case "connectionless":
-      await browser.runtime.sendNativeMessage(
+      if (scriptType == "extended" && deltaPayload) {
+        window.scrNoti.encodeDelta(payload, message, event);
+      };
+      if (scriptType == "extended" && tracePayload) {
+        window.scrNoti.startTrace(payload, eventTime);
+      };
+      const reply = await browser.runtime.sendNativeMessage(
         "scriptableNotifications",
         payload
       );
+      await window.scrNoti.onNativeReply(reply);
       break;
     case "connectionbased":
       if (nativeConnection == null) {
         nativeConnection = await browser.runtime.connectNative(
           "scriptableNotifications");
+        // A new script has not received any accounts and folders yet
+        window.scrNoti.resetDelta();
+        nativeConnection.onMessage.addListener(window.scrNoti.onNativeReply);
+      };
+      if (scriptType == "extended" && deltaPayload) {
+        window.scrNoti.encodeDelta(payload, message, event);
+      };
+      if (scriptType == "extended" && tracePayload) {
+        window.scrNoti.startTrace(payload, eventTime);
       };
       await nativeConnection.postMessage(payload);
       break;
   };
 
+  if (scriptType == "simple") {
+    lastSimplePayload = payload;
+  };
+};
+
+//==========================================
+// The accounts sent to the native script
+//
+// The list is cached, until an account or an
+// identity changes.
+//==========================================
+let accountsListCache = null;
+
+window.scrNoti.getAccountsList = async () => {
+  if (accountsListCache == null) {
+    accountsListCache = messenger.accounts.list(false).then((accounts) => {
+      const accountsList = {};
+      for (const account of accounts) {
+        const identitiesList = [];
+        for (const identity of account.identities) {
+          const mailIdentity = {
+            email: identity.email,
+            label: identity.label,
+            name: identity.name,
+            organization: identity.organization,
+          };
+          identitiesList.push(mailIdentity);
+        };
+
+        const mailAccount = {
+          identities: identitiesList,
+          name: account.name,
+          type: account.type,
+        };
+        accountsList[account.id] = mailAccount;
+      };
+      return accountsList;
+    });
+    // Do not cache a failure
+    accountsListCache.catch(() => {
+      accountsListCache = null;
+    });
+  }
+  return accountsListCache;
+};
+
+window.scrNoti.accountsOnChangedListener = () => {
+  accountsListCache = null;
+};
+// These events are not available in all versions of Thunderbird
+for (const events of [messenger.accounts, messenger.identities]) {
+  for (const name of ["onCreated", "onDeleted", "onUpdated"]) {
+    if (events && events[name]) {
+      events[name].removeListener(window.scrNoti.accountsOnChangedListener);
+      events[name].addListener(window.scrNoti.accountsOnChangedListener);
+    }
+  }
+};
+
+//==========================================
+// The message data sent to the native script
+//==========================================
+window.scrNoti.getMessageDetails = (message) => {
+  const folder = message.folder;
+  return {
+    author: message.author,
+    bccList: message.bbcList,
+    ccList: message.ccList,
+    date: message.date,
+    flagged: message.flagged,
+    messageId: message.headerMessageId,
+    headersOnly: message.headersOnly,
+    junk: message.junk,
+    junkScore: message.junkScore,
+    read: message.read,
+    size: message.size,
+    subject: message.subject,
+    tags: message.tags,
+    folder: {
+      accountId: folder.accountId,
+      name: folder.name,
+      path: folder.path,
+      type: folder.type,
+    },
+  };
+};
+
+//==========================================
+// Delta encoded payloads
+//
+// The accounts and folders are only sent, when
+// they have changed since the last payload. The
+// script keeps the last accounts and folders
+// (see 'scriptExamples/common/nativedelta.py').
+// If it misses them, it replies with
+// '{"resync": <seq>}' and the complete payload
+// is sent again.
+//==========================================
+const deltaState = {
+  // Makes the versions unique across restarts of Thunderbird
+  session: Math.random().toString(36).slice(2),
+  counter: 0,
+  seq: 0,
+  accountsJson: null,
+  accountsVersion: null,
+  // Map: accountId + path => JSON of the folder data
+  folders: null,
+  foldersVersion: null,
+  // Map: seq => [message, event] of the recent payloads
+  sent: new Map(),
+};
+const deltaMaxSent = 100;
+
+window.scrNoti.resetDelta = () => {
+  deltaState.accountsJson = null;
+  deltaState.accountsVersion = null;
+  deltaState.folders = null;
+  deltaState.foldersVersion = null;
+  deltaState.sent.clear();
+};
+
+window.scrNoti.nextDeltaVersion = () => {
+  deltaState.counter += 1;
+  return `${deltaState.session}:${deltaState.counter}`;
+};
+
+window.scrNoti.encodeDelta = (payload, message, event) => {
+  const version = {};
+
+  // Accounts
+  const accountsJson = JSON.stringify(payload.accounts);
+  if (accountsJson === deltaState.accountsJson) {
+    delete payload.accounts;
+  } else {
+    deltaState.accountsJson = accountsJson;
+    deltaState.accountsVersion = window.scrNoti.nextDeltaVersion();
+  };
+  version.accounts = deltaState.accountsVersion;
+
+  // Folders
+  const folders = new Map();
+  for (const folder of payload.folders) {
+    folders.set(folder.accountId + folder.path, JSON.stringify(folder));
+  };
+  const previous = deltaState.folders;
+  const sameFolders = previous != null
+    && previous.size == folders.size
+    && [...folders.keys()].every((key) => previous.has(key));
+  if (sameFolders) {
+    const changedFolders = payload.folders.filter((folder) => {
+      const key = folder.accountId + folder.path;
+      return folders.get(key) !== previous.get(key);
+    });
+    version.foldersBase = deltaState.foldersVersion;
+    if (changedFolders.length > 0) {
+      deltaState.foldersVersion = window.scrNoti.nextDeltaVersion();
+    };
+    delete payload.folders;
+    payload.changedFolders = changedFolders;
+  } else {
+    deltaState.foldersVersion = window.scrNoti.nextDeltaVersion();
+  };
+  deltaState.folders = folders;
+  version.folders = deltaState.foldersVersion;
+
+  deltaState.seq += 1;
+  payload.version = version;
+  payload.seq = deltaState.seq;
+
+  // Remember the payload to send it again on request
+  deltaState.sent.set(deltaState.seq, [message, event]);
+  if (deltaState.sent.size > deltaMaxSent) {
+    deltaState.sent.delete(deltaState.sent.keys().next().value);
+  };
+};
+
+window.scrNoti.onNativeReply = async (reply) => {
+  if (!reply || typeof reply != "object") {
+    return;
+  };
+  if ("trace" in reply) {
+    window.scrNoti.finishTrace(reply.trace);
+  };
+  if (!("resync" in reply)) {
+    return;
+  };
+  const sent = deltaState.sent.get(reply.resync);
+  // The next payload is sent completely
+  window.scrNoti.resetDelta();
+  if (sent) {
+    await window.scrNoti.notifyNativeScript(...sent);
+  };
+};
+
+//==========================================
+// Latency tracing
+//
+// The payload gets a 'trace' block with the time
+// of the event and the time taken to assemble
+// the payload. The script replies with the time
+// it took to decode and to handle the payload
+// ('{"trace": {"id": ..., "decode": ..., "handle":
+// ...}}', see 'scriptExamples/common/nativehost.py').
+// The times (in ms) of the last payloads are kept
+// for each stage:
+//   assemble: from the event to sending the payload
+//   transport: sending, starting the script and
+//     replying (round-trip without decode/handle)
+//   decode, handle: in the script
+//   total: from the event to the reply
+//==========================================
+const traceBuckets = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000];
+const traceMaxSamples = 1000;
+const traceMaxPending = 100;
+const traceState = {
+  id: 0,
+  // Map: id => {eventTime, sentTime}
+  pending: new Map(),
+  // stage => array of times (ms)
+  samples: {},
+};
+
+window.scrNoti.startTrace = (payload, eventTime) => {
+  traceState.id += 1;
+  const sentTime = performance.now();
+  payload.trace = {
+    id: traceState.id,
+    // Milliseconds since the epoch
+    time: performance.timeOrigin + eventTime,
+    stages: {
+      assemble: sentTime - eventTime,
+    },
+  };
+  traceState.pending.set(traceState.id, { eventTime, sentTime });
+  if (traceState.pending.size > traceMaxPending) {
+    traceState.pending.delete(traceState.pending.keys().next().value);
+  };
+};
+
+window.scrNoti.addTraceSample = (stage, time) => {
+  if (!(stage in traceState.samples)) {
+    traceState.samples[stage] = [];
+  };
+  const samples = traceState.samples[stage];
+  samples.push(time);
+  if (samples.length > traceMaxSamples) {
+    samples.shift();
+  };
+};
+
+window.scrNoti.finishTrace = (trace) => {
+  const pending = traceState.pending.get(trace.id);
+  if (!pending) {
+    return;
+  };
+  traceState.pending.delete(trace.id);
+  const now = performance.now();
+  const decode = trace.decode || 0;
+  const handle = trace.handle || 0;
+  window.scrNoti.addTraceSample(
+    "assemble", pending.sentTime - pending.eventTime);
+  window.scrNoti.addTraceSample(
+    "transport", now - pending.sentTime - decode - handle);
+  window.scrNoti.addTraceSample("decode", decode);
+  window.scrNoti.addTraceSample("handle", handle);
+  window.scrNoti.addTraceSample("total", now - pending.eventTime);
+};
+
+window.scrNoti.getTraceHistograms = () => {
+  const histograms = {};
+  for (const [stage, samples] of Object.entries(traceState.samples)) {
+    // The last count is for the times above the last bucket
+    const counts = new Array(traceBuckets.length + 1).fill(0);
+    for (const time of samples) {
+      const i = traceBuckets.findIndex((bucket) => time <= bucket);
+      counts[i < 0 ? traceBuckets.length : i] += 1;
+    };
+    const sorted = [...samples].sort((a, b) => a - b);
+    const percentile = (p) =>
+      sorted[Math.max(0, Math.ceil(p / 100 * sorted.length) - 1)];
+    histograms[stage] = {
+      count: samples.length,
+      p50: percentile(50),
+      p99: percentile(99),
+      max: sorted[sorted.length - 1],
+      buckets: traceBuckets,
+      counts: counts,
+    };
+  };
+  return histograms;
 };
 
 //==========================================
 // Get the folders to check for unread messages
 //==========================================
 window.scrNoti.getFoldersToCheckForUnread = async () => {
-  const { foldersToCheck } = await messenger.storage.local.get({
-    foldersToCheck: [],
-  });
+  const { foldersToCheck } = await window.scrNoti.getOptions();
 
   return foldersToCheck;
 };
@@ -268,19 +660,9 @@ window.scrNoti.isFolderToCheck = async (folder) => {
     return false;
   }
 
-  const foldersToCheckForUnread =
-    await window.scrNoti.getFoldersToCheckForUnread();
-
-  for (const folderToCheck of foldersToCheckForUnread) {
-    if (
-      folderToCheck.accountId === folder.accountId &&
-      folderToCheck.path === folder.path
-    ) {
-      return true;
-    }
-  }
+  const { foldersToCheckKeys } = await window.scrNoti.getOptions();
 
-  return false;
+  return foldersToCheckKeys.has(folder.accountId + folder.path);
 };
 
 //==========================================
@@ -325,9 +707,52 @@ window.scrNoti.tryNbrTimes = async (fnct, nbrTime) => {
   await tryNbrTimesInner(1);
 };
 
+//==========================================
+// List all messages matching the query
+//==========================================
+async function* queryMessages(queryInfo) {
+  let page = await messenger.messages.query(queryInfo);
+  for (let message of page.messages) {
+    yield message;
+  }
+
+  while (page.id) {
+    page = await messenger.messages.continueList(page.id);
+    for (let message of page.messages) {
+      yield message;
+    }
+  }
+};
+window.scrNoti.queryMessages = queryMessages;
+
+//==========================================
+// Call the async function for all items, but
+// with at most 'limit' calls at the same time.
+//==========================================
+window.scrNoti.forEachConcurrently = async (items, limit, fnct) => {
+  let next = 0;
+  async function worker() {
+    while (next < items.length) {
+      const item = items[next];
+      next += 1;
+      await fnct(item);
+    }
+  }
+  const workers = [];
+  for (let i = 0; i < Math.min(limit, items.length); i++) {
+    workers.push(worker());
+  }
+  await Promise.all(workers);
+};
+
 //==========================================
 // Store all unread messages in global variable 'seenMessages'.
+//
+// Only the unread messages are queried and the
+// folders are scanned concurrently.
 //==========================================
+const updateSeenMessagesConcurrency = 4;
+
 window.scrNoti.updateSeenMessages = async () => {
   const scriptType = await window.scrNoti.getScriptType();
   if (scriptType == "simple") {
@@ -339,16 +764,32 @@ window.scrNoti.updateSeenMessages = async () => {
     return;
   }
 
-  for (const folderToCheck of foldersToCheck) {
-    const seen = new Set();
-    for await (const message of listMessages(folderToCheck)) {
-      if (!message.junk && !message.read) {
-        seen.add(message.id);
+  const start = performance.now();
+  await window.scrNoti.forEachConcurrently(
+    foldersToCheck,
+    updateSeenMessagesConcurrency,
+    async (folderToCheck) => {
+      const folderStart = performance.now();
+      const seen = new Set();
+      for await (const message of queryMessages({
+        folderId: folderToCheck.id,
+        unread: true,
+      })) {
+        if (!message.junk) {
+          seen.add(message.id);
+        }
       }
+      // Save it
+      seenMessages[folderToCheck.accountId + folderToCheck.path] = seen;
+      console.debug(
+        `Scriptable Notifications: ${seen.size} unread messages in `
+        + `${folderToCheck.accountId}${folderToCheck.path} `
+        + `(${Math.round(performance.now() - folderStart)} ms)`);
     }
-    // Save it
-    seenMessages[folderToCheck.accountId + folderToCheck.path] = seen;
-  }
+  );
+  console.debug(
+    `Scriptable Notifications: ${foldersToCheck.length} folders scanned `
+    + `(${Math.round(performance.now() - start)} ms)`);
 };
 
 //==========================================
@@ -156,6 +156,18 @@ const addListeners = async () => {
       document.getElementById("notifyScriptRead").disabled = false;
     });
 
+  document
+    .querySelector("#traceShow")
+    .addEventListener("click", async () => {
+      await showTraceHistograms();
+    });
+
+  document
+    .querySelector("#traceExport")
+    .addEventListener("click", async () => {
+      await exportTraceHistograms();
+    });
+
   document
     .querySelector("#notifyScriptTrue")
     .addEventListener("click", async () => {
@@ -285,10 +297,13 @@ const sendTestToScript = async (event) => {
         "type": "inbox"}
       }
     };
+  // All messages of the event (only one in this test)
+  payload.messages = [payload.message];
   switch (event) {
     case "start":
       // Set message to null
       payload.message = null;
+      payload.messages = [];
       await browser.runtime.sendNativeMessage(
         "scriptableNotifications",
         payload
@@ -337,10 +352,22 @@ const saveOptions = async () => {
   // "connectionless" or "connectionbased"
   const connectionType = document.querySelector('input[name="notifyConnection"]:checked').value;
 
+  // Only send changed accounts and folders ("extended" only)
+  const deltaPayload = document.getElementById("notifyDeltaPayload").checked;
+
+  // Only send changes of the state ("simple" only)
+  const onlyStateChanges = document.getElementById("notifyOnlyStateChanges").checked;
+
+  // Measure the time until the script replies ("extended" only)
+  const tracePayload = document.getElementById("notifyTracePayload").checked;
+
   await messenger.storage.local.set({
     foldersToCheck: foldersToCheck,
     scriptType: scriptType,
     connectionType: connectionType,
+    deltaPayload: deltaPayload,
+    onlyStateChanges: onlyStateChanges,
+    tracePayload: tracePayload,
   });
 
   // Sent "options changed" message
@@ -429,6 +456,21 @@ const restoreOptions = async () => {
       break;
   };
 
+  const { deltaPayload } = await messenger.storage.local.get({
+    deltaPayload: false,
+  });
+  document.getElementById("notifyDeltaPayload").checked = deltaPayload;
+
+  const { onlyStateChanges } = await messenger.storage.local.get({
+    onlyStateChanges: false,
+  });
+  document.getElementById("notifyOnlyStateChanges").checked = onlyStateChanges;
+
+  const { tracePayload } = await messenger.storage.local.get({
+    tracePayload: false,
+  });
+  document.getElementById("notifyTracePayload").checked = tracePayload;
+
   if (isWindows) {
     document.querySelector("#tabWindows").click();
   } else if (isMac) {
@@ -438,6 +480,55 @@ const restoreOptions = async () => {
   }
 };
 
+//==========================================
+// Show and export the times measured
+//==========================================
+const showTraceHistograms = async () => {
+  const histograms = await browser.runtime.sendMessage({getTraceHistograms: true});
+  const tableEl = document.querySelector("#traceHistograms");
+  tableEl.textContent = "";
+
+  const stages = Object.keys(histograms);
+  if (stages.length < 1) {
+    tableEl.insertRow().insertCell().textContent = "No times measured yet.";
+    return;
+  }
+
+  const buckets = histograms[stages[0]].buckets;
+  const header = ["Stage", "Count", "p50", "p99", "Max"]
+    .concat(buckets.map((bucket) => `≤ ${bucket}`), [`> ${buckets.at(-1)}`]);
+  const headerEl = tableEl.insertRow();
+  for (const text of header) {
+    const cellEl = document.createElement("th");
+    cellEl.textContent = text;
+    headerEl.appendChild(cellEl);
+  }
+  for (const stage of stages) {
+    const histogram = histograms[stage];
+    const rowEl = tableEl.insertRow();
+    const cells = [
+      stage,
+      histogram.count,
+      `${histogram.p50.toFixed(1)} ms`,
+      `${histogram.p99.toFixed(1)} ms`,
+      `${histogram.max.toFixed(1)} ms`,
+    ].concat(histogram.counts);
+    for (const text of cells) {
+      rowEl.insertCell().textContent = text;
+    }
+  }
+};
+
+const exportTraceHistograms = async () => {
+  const histograms = await browser.runtime.sendMessage({getTraceHistograms: true});
+  const a = document.createElement("a");
+  const file = new Blob(
+    [JSON.stringify(histograms, null, 2)], { type: "text/json" });
+  a.href = URL.createObjectURL(file);
+  a.download = "scriptableNotificationsTimes.json";
+  a.click();
+};
+
 //==========================================
 // Download manifest
 //==========================================
@@ -0,0 +1,225 @@
+"""
+Tests of the system tray icon `script-systemtrayicon.py`.
+
+The icon is not shown: `pystray` is replaced by `FakePystray`, which records
+what the script does with the icon.
+
+Run them with `python3 -m pytest tests`.
+
+MIT License
+Copyright (C) 2026  The Scriptable Notifications contributors
+
+"""
+
+import asyncio
+import importlib.util
+import pathlib
+import sys
+import tracemalloc
+import types
+
+import pytest
+
+
+TRAY = (
+    pathlib.Path(__file__).resolve().parents[1] / 'scriptExamples'
+    / 'extendedMode' / 'system-tray' / 'script-systemtrayicon.py')
+
+
+def load(path):
+    """Import the script at `path` as a module (without running `main()`)."""
+    spec = importlib.util.spec_from_file_location(
+        path.stem.replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeIcon:
+    """Records the state of the icon and the notifications."""
+
+    HAS_MENU = False
+    HAS_DEFAULT_ACTION = False
+
+    def __init__(self, name, icon=None, title=None, menu=None):
+        self.icon = icon
+        self.title = title
+        self.visible = False
+        self.notifications = []
+
+    def notify(self, message, title=None):
+        self.notifications.append(message)
+
+    def remove_notification(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+FakePystray = types.SimpleNamespace(Icon=FakeIcon)
+
+
+@pytest.fixture
+def tray(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'pystray', FakePystray)
+    tray = load(TRAY)
+    monkeypatch.setitem(tray.CONFIG, 'notify', True)
+    monkeypatch.setitem(tray.CONFIG, 'icon_cache', False)
+    monkeypatch.setitem(tray.CONFIG, 'state', False)
+    monkeypatch.setitem(tray.CONFIG, 'metrics', False)
+    monkeypatch.setitem(tray.CONFIG, 'diagnostics', False)
+    return tray
+
+
+def payload(event, unread, message=None):
+    """Return an extended payload.
+
+    Parameters
+    ----------
+    unread : dict
+        The unread message counts by the path of the folders.
+    message : tuple
+        The path of the folder and the ID of the message.
+    """
+    msg = {
+        'event': event,
+        'accounts': {'account1': {'name': 'Account 1'}},
+        'folders': [
+            {'accountId': 'account1', 'path': path,
+             'unreadMessageCount': count}
+            for path, count in unread.items()],
+        'messages': [],
+    }
+    if message is not None:
+        path, message_id = message
+        msg['messages'].append({
+            'messageId': message_id,
+            'folder': {'accountId': 'account1', 'path': path}})
+    return msg
+
+
+def updates(tray, icon, *msgs):
+    """Pass `msgs` to the icon within one update window and apply them."""
+    import nativepayload
+
+    async def run():
+        for msg in msgs:
+            icon.update(nativepayload.Event.from_dict(msg))
+        await asyncio.sleep(tray.CONFIG['update_window'] * 2)
+    asyncio.run(run())
+
+
+#
+# Merging the updates
+#
+
+def test_new_then_read_notifies(tray):
+    icon = tray.StatusIcon()
+    unread = {'/INBOX': 1, '/Other': 0}
+    updates(
+        tray, icon,
+        payload('new', unread, ('/INBOX', 'id1@example.org')),
+        payload('read', unread, ('/Other', 'id0@example.org')))
+    assert icon.updates_applied == 1
+    assert icon.unseen == 1
+    assert icon.icon.notifications
+    assert icon.icon.visible
+
+
+def test_new_then_start_notifies(tray):
+    icon = tray.StatusIcon()
+    updates(
+        tray, icon,
+        payload('new', {'/INBOX': 1}, ('/INBOX', 'id1@example.org')),
+        payload('start', {'/INBOX': 1}))
+    assert icon.updates_applied == 1
+    assert icon.icon.notifications
+    assert icon.icon.visible
+
+
+def test_new_then_read_of_the_new_message_hides(tray):
+    icon = tray.StatusIcon()
+    updates(
+        tray, icon,
+        payload('new', {'/INBOX': 1}, ('/INBOX', 'id1@example.org')),
+        payload('read', {'/INBOX': 0}, ('/INBOX', 'id1@example.org')))
+    assert icon.updates_applied == 1
+    assert icon.unseen == 0
+    assert not icon.icon.notifications
+    assert not icon.icon.visible
+
+
+#
+# Folders
+#
+
+def test_folders_are_only_rebuilt_when_changed(tray):
+    icon = tray.StatusIcon()
+    unread = {'/INBOX': 1, '/Other': 0}
+    updates(
+        tray, icon, payload('new', unread, ('/INBOX', 'id1@example.org')))
+    assert icon.icon.title == '   1 Account 1/INBOX'
+    labels = icon._folder_labels
+    updates(tray, icon, payload('read', unread, ('/Other', 'id0@example.org')))
+    assert icon._folder_labels is labels
+
+    # Another folder with the same number of folders
+    renamed = payload('read', {'/INBOX': 1, '/Renamed': 0})
+    renamed['accounts']['account1']['name'] = 'Work'
+    updates(tray, icon, renamed)
+    assert icon._folder_ids == ['account1/INBOX', 'account1/Renamed']
+    assert icon.icon.title == '   1 Work/INBOX'
+
+
+#
+# Message IDs
+#
+
+def message_ids(n):
+    return [f'{i:08x}-0cea-c454-e6c3-86f452807092@nowhere.org'
+            for i in range(n)]
+
+
+def test_message_ids_memory(tray):
+    # Bytes allocated per message remembered (a `set` of the strings needs
+    # about 150 bytes)
+    ids = message_ids(10000)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        messages = tray.MessageIds(len(ids))
+        for message_id in ids:
+            messages.add(message_id)
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    assert len(messages) == len(ids)
+    assert size / len(ids) < 32
+
+
+def test_message_ids_forget_the_oldest(tray):
+    ids = message_ids(25)
+    messages = tray.MessageIds(10)
+    for message_id in ids + ids[-5:]:
+        messages.add(message_id)
+    assert len(messages) == 25
+    assert messages.remembered == 10
+    assert messages.forgotten == 15
+    assert ids[14] not in messages
+    assert all(message_id in messages for message_id in ids[15:])
+
+    # Stored and restored with the oldest first
+    restored = tray.MessageIds.frombytes(
+        messages.tobytes(), messages.forgotten, 10)
+    restored.add('new@nowhere.org')
+    assert ids[15] not in restored
+    assert ids[16] in restored
+    assert len(restored) == 26
+
+    # Fewer messages remembered after a restart
+    restored = tray.MessageIds.frombytes(
+        messages.tobytes(), messages.forgotten, 4)
+    assert len(restored) == 25
+    assert ids[20] not in restored
+    assert all(message_id in restored for message_id in ids[21:])